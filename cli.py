@@ -0,0 +1,321 @@
+'''
+# License: MIT
+Copyright 2024 [vladislawzero@gmail.com](mailto:vladislawzero@gmail.com) | discord: _zener_diode | [https://github.com/SchottkyDi0de](https://github.com/SchottkyDi0de)
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions: The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+This license applies to all files in this project that contain Python source code unless otherwise specified!
+'''
+
+import json
+import os
+import shutil
+import sys
+from argparse import ArgumentParser, Namespace
+from pathlib import Path
+
+from lib.codec import AUTO_COMPRESSION, parse_compression
+from lib.container import ZipContainer, is_container
+from lib.dvp_struct import CompressionTypes, TreeWalker
+from lib.bundle import BundleReader, entry_target
+from lib.engine import DVPLEngine, EngineCallbacks, EngineOptions, JobResult, unpack_target
+from lib.index import FooterIndex
+from lib.verify import VerifyReport, verify_file
+
+
+def build_parser() -> ArgumentParser:
+    parser = ArgumentParser(prog='python -m cli', description='DVPL Extractor headless mode')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    unpack = commands.add_parser('unpack', help='unpack DVPL file or folder tree')
+    pack = commands.add_parser('pack', help='pack file or folder tree to DVPL')
+    verify = commands.add_parser('verify', help='check DVPL file or folder tree integrity')
+    bench = commands.add_parser('bench', help='run pack / unpack benchmark on a synthetic corpus')
+    index = commands.add_parser('index', help='build or refresh footer index of a folder tree and print summary')
+    bundle = commands.add_parser('bundle', help='list or extract DVPL bundle written by pack --bundle')
+
+    for command in (unpack, pack):
+        command.add_argument('path', type=Path, help='source file or folder (unpack: also APK / OBB / zip)')
+        command.add_argument('-o', '--output', type=Path, default=None, help='target folder (default: next to source)')
+        command.add_argument('--remove-originals', action='store_true', help='remove source files after the job')
+        command.add_argument('--skip-if-exists', action='store_true', help='do not overwrite existing target files')
+        command.add_argument('--fast', action='store_true', help='log every 100 files only')
+        command.add_argument('-q', '--quiet', action='store_true', help='print final result only')
+        command.add_argument('-j', '--jobs', type=int, default=1, help='workers count for folder jobs (default: 1)')
+        command.add_argument('--journal', action='store_true', help='record completed files, so an interrupted job can be resumed')
+        command.add_argument('--resume', action='store_true', help='skip files completed by an interrupted run (implies --journal)')
+        command.add_argument(
+            '--order', choices=['scan', 'largest_first', 'smallest_first'], default='largest_first',
+            help='folder files order, largest first shortens parallel jobs (default: largest_first)'
+        )
+        command.add_argument(
+            '--memory-limit', type=int, default=None,
+            help='max projected memory of files processed at once in MB (default: no limit)'
+        )
+        command.add_argument('--no-pipeline', action='store_true', help='do not overlap reading, (de)compression and writing')
+        command.add_argument('--trace', type=Path, default=None, help='write JSONL trace with per-stage timings of every file')
+        command.add_argument('--index', action='store_true', help='list folder files from the footer index (see index command)')
+        command.add_argument(
+            '--executor', choices=['thread', 'process'], default='thread',
+            help='worker pool type (default: thread)'
+        )
+
+    unpack.add_argument(
+        '--root', default='',
+        help='folder inside APK / OBB / zip source to unpack, e.g. assets/Data (default: whole container)'
+    )
+    unpack.add_argument(
+        '--sync', action='store_true',
+        help='unpack only files changed or added since the last sync into the target, delete outputs of removed files'
+    )
+
+    pack.add_argument(
+        '-c', '--compression',
+        choices=[x.name for x in CompressionTypes] + [AUTO_COMPRESSION],
+        default=CompressionTypes.LZ4.name,
+        help='compression type, AUTO chooses per file (default: LZ4)'
+    )
+    pack.add_argument('--incremental', action='store_true', help='pack only files changed since the last incremental run')
+    pack.add_argument('--dedup', action='store_true', help='compress identical files once')
+    pack.add_argument('--cache', type=Path, default=None, help='persistent compression cache folder (enables --dedup)')
+    pack.add_argument('--cache-size', type=int, default=1024, help='persistent cache size limit in MB (default: 1024)')
+    pack.add_argument('--bundle', type=Path, default=None, help='pack folder into one bundle file instead of a DVPL tree')
+
+    bundle.add_argument('path', type=Path, help='bundle file')
+    bundle.add_argument('names', nargs='*', help='entries to extract (default: all)')
+    bundle.add_argument('-o', '--output', type=Path, default=None, help='extract DVPL files into folder (default: list entries)')
+    bundle.add_argument('--unpack', action='store_true', help='extract unpacked files instead of DVPL files')
+
+    verify.add_argument('path', type=Path, help='DVPL file or folder')
+    verify.add_argument('--decompress', action='store_true', help='also try to decompress every file in memory')
+    verify.add_argument('--report', type=Path, default=None, help='write JSON report to file, "-" for stdout')
+    verify.add_argument('--fast', action='store_true', help='report progress every 100 files only')
+    verify.add_argument('-q', '--quiet', action='store_true', help='print final result only')
+    verify.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1, help='workers count (default: CPU count)')
+    verify.add_argument(
+        '--executor', choices=['thread', 'process'], default='thread',
+        help='worker pool type (default: thread)'
+    )
+
+    index.add_argument('path', type=Path, help='folder')
+    index.add_argument('--check-files', action='store_true', help='also detect files overwritten in place (stats every file)')
+
+    bench.add_argument('--output', type=Path, default=None, help='write JSON report to file (default: stdout)')
+    bench.add_argument('--corpus', type=Path, default=None, help='corpus folder, generated if it does not exist (default: temporary)')
+    bench.add_argument('--scale', type=float, default=1.0, help='corpus size multiplier (default: 1.0)')
+    bench.add_argument(
+        '-c', '--compression', nargs='+', choices=[x.name for x in CompressionTypes],
+        default=[x.name for x in CompressionTypes], help='compression types to benchmark (default: all)'
+    )
+    bench.add_argument('--repeat', type=int, default=3, help='runs per stage, best time is reported (default: 3)')
+    bench.add_argument('--baseline', type=Path, default=None, help='previous JSON report to compare with')
+    bench.add_argument('--threshold', type=float, default=0.1, help='allowed slowdown against baseline (default: 0.1)')
+    bench.add_argument('-j', '--jobs', type=int, default=1, help='workers count (default: 1)')
+    bench.add_argument(
+        '--executor', choices=['thread', 'process'], default='thread',
+        help='worker pool type (default: thread)'
+    )
+
+    return parser
+
+
+def build_engine(args: Namespace) -> DVPLEngine:
+    options = EngineOptions(
+        keep_originals=not getattr(args, 'remove_originals', False),
+        skip_if_exists=getattr(args, 'skip_if_exists', False),
+        fast_mode=args.fast,
+        compression_type=parse_compression(getattr(args, 'compression', CompressionTypes.LZ4.name)),
+        jobs=args.jobs,
+        executor=args.executor,
+        incremental=getattr(args, 'incremental', False),
+        dedup=getattr(args, 'dedup', False),
+        cache_path=getattr(args, 'cache', None),
+        cache_size=getattr(args, 'cache_size', 1024) * 1024 * 1024,
+        journal=getattr(args, 'journal', False),
+        resume=getattr(args, 'resume', False),
+        order=getattr(args, 'order', 'largest_first'),
+        memory_limit=args.memory_limit * 1024 * 1024 if getattr(args, 'memory_limit', None) else None,
+        pipeline=not getattr(args, 'no_pipeline', False),
+        trace_path=getattr(args, 'trace', None),
+        sync=getattr(args, 'sync', False),
+        bundle_path=getattr(args, 'bundle', None)
+    )
+    callbacks = EngineCallbacks()
+
+    if not args.quiet:
+        callbacks.log = lambda log, prefix: print(prefix + log, file=sys.stderr, flush=True)
+
+    return DVPLEngine(options, callbacks)
+
+
+def run(args: Namespace) -> JobResult:
+    engine = build_engine(args)
+    path: Path = args.path
+
+    if not path.exists():
+        raise FileNotFoundError(f"Path not found: {path}")
+
+    if path.is_dir():
+        target_path = args.output if args.output is not None else path
+        folder = FooterIndex.open(path) if args.index else TreeWalker(path)
+
+        if args.command == 'unpack':
+            return engine.unpack_folder(folder, target_path)
+
+        return engine.pack_folder(folder, target_path)
+
+    if getattr(args, 'bundle', None) is not None:
+        raise ValueError("Bundle output is supported for folders only")
+
+    if args.command == 'unpack' and is_container(path):
+        target_path = args.output if args.output is not None else path.with_suffix('')
+        return engine.unpack_folder(ZipContainer(path, args.root), target_path)
+
+    target_path = args.output if args.output is not None else path.parent
+
+    if args.command == 'unpack':
+        return engine.unpack_file(path, target_path)
+
+    return engine.pack_file(path, target_path)
+
+
+def run_verify(args: Namespace) -> VerifyReport:
+    path: Path = args.path
+
+    if not path.exists():
+        raise FileNotFoundError(f"Path not found: {path}")
+
+    if path.is_dir():
+        return build_engine(args).verify_folder(TreeWalker(path), decompress=args.decompress)
+
+    report = VerifyReport(path=str(path))
+    report.add(verify_file(path, decompress=args.decompress))
+
+    return report
+
+
+def run_index(args: Namespace) -> FooterIndex:
+    path: Path = args.path
+
+    if not path.is_dir():
+        raise NotADirectoryError(f"Folder not found: {path}")
+
+    index = FooterIndex.load(path)
+    index.refresh(args.check_files)
+    index.save()
+
+    return index
+
+
+def run_bundle(args: Namespace) -> int:
+    reader = BundleReader(args.path)
+    names = args.names or reader.names()
+
+    if args.output is None:
+        for name in names:
+            footer = reader.footer(name)
+            print(f'{name}\t{footer.input_file_size}\t{reader.entry(name).size}\t{footer.compression_type.name}')
+
+        return 0
+
+    if not args.unpack:
+        count = reader.extract(args.output, names)
+        print(f'[bundle]: {count} DVPL files extracted to {args.output}', file=sys.stderr)
+        return 0
+
+    # check every name before writing anything
+    targets = [(name, entry_target(args.output, name)) for name in names]
+
+    for name, target in targets:
+        target = target.with_name(unpack_target(target))
+        target.parent.mkdir(parents=True, exist_ok=True)
+
+        with reader.open(name) as source, open(target, 'wb') as new_file:
+            shutil.copyfileobj(source, new_file)
+
+    print(f'[bundle]: {len(names)} files unpacked to {args.output}', file=sys.stderr)
+    return 0
+
+
+def write_report(report: VerifyReport, target: Path) -> None:
+    data = json.dumps(report.to_dict(), indent=4)
+
+    if str(target) == '-':
+        print(data)
+        return
+
+    target.write_text(data, encoding='utf-8')
+
+
+def run_bench(args: Namespace) -> int:
+    # benchmark needs psutil, other commands run with lz4 only
+    from lib.benchmark import compare_reports, load_report, run_benchmark
+
+    report = run_benchmark(
+        corpus_path=args.corpus,
+        scale=args.scale,
+        jobs=args.jobs,
+        executor=args.executor,
+        compression_types=[CompressionTypes[x] for x in args.compression],
+        repeat=args.repeat
+    )
+    data = json.dumps(report, indent=4)
+
+    if args.output is None:
+        print(data)
+    else:
+        args.output.write_text(data, encoding='utf-8')
+
+    if args.baseline is None:
+        return 0
+
+    regressions = compare_reports(report, load_report(args.baseline), args.threshold)
+    for regression in regressions:
+        print(f'[bench]: regression {regression}', file=sys.stderr)
+
+    return 1 if regressions else 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+
+    try:
+        if args.command == 'bench':
+            return run_bench(args)
+
+        if args.command == 'bundle':
+            return run_bundle(args)
+
+        if args.command == 'index':
+            index = run_index(args)
+            print(f'[index]: {index.rescanned} folders rescanned in {index.scan_time:.3f}s', file=sys.stderr)
+            print(str(index.folder_meta) + str(index.summary()))
+            return 0
+
+        if args.command == 'verify':
+            report = run_verify(args)
+
+            if args.report is not None:
+                write_report(report, args.report)
+
+            print(report, file=sys.stderr if str(args.report) == '-' else sys.stdout)
+            return 1 if report.canceled or report.bad_files else 0
+
+        result = run(args)
+    except KeyboardInterrupt:
+        print('Interrupted', file=sys.stderr)
+        return 130
+    except (OSError, ValueError) as e:
+        print(f'[stderr]: {e}', file=sys.stderr)
+        return 1
+
+    print(result)
+    return 1 if result.canceled else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,235 @@
+import json
+import os
+import platform
+import random
+import shutil
+import struct
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from threading import Event, Thread
+from typing import Any, Callable, Optional
+
+import psutil
+
+from lib.dvp_struct import CompressionTypes, Folder
+from lib.engine import DVPLEngine, EngineOptions
+
+CORPUS_SEED = 20240101
+
+
+@dataclass
+class BenchResult:
+    name: str
+    files: int
+    bytes: int
+    seconds: float
+    files_per_s: float
+    mb_per_s: float
+    peak_rss_mb: float
+
+
+class RSSSampler:
+    '''
+    ### Background sampler of process peak RSS
+    '''
+    def __init__(self, interval: float = 0.01) -> None:
+        self.interval = interval
+        self.process = psutil.Process()
+        self.peak = 0
+        self._stop = Event()
+        self._thread = Thread(target=self._run, daemon=True, name="RSSSamplerThread")
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self.process.memory_info().rss)
+            self._stop.wait(self.interval)
+
+    def __enter__(self) -> 'RSSSampler':
+        self.peak = self.process.memory_info().rss
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.process.memory_info().rss)
+
+
+def _config_text(rnd: random.Random) -> bytes:
+    keys = ['name', 'id', 'speed', 'armor', 'gun', 'shell', 'reload', 'angle', 'crew', 'module']
+    lines = [f'{rnd.choice(keys)}_{rnd.randrange(100)}: {rnd.random():.4f}' for _ in range(rnd.randrange(8, 200))]
+    return ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+def _mesh_data(rnd: random.Random, size: int) -> bytes:
+    # a few random-walk vertex chunks shuffled together, compresses like real vertex buffers
+    chunks = []
+    for _ in range(4):
+        vertices = bytearray()
+        base = [rnd.uniform(-10, 10) for _ in range(3)]
+        for _ in range(2048):
+            base = [x + rnd.uniform(-0.05, 0.05) for x in base]
+            vertices += struct.pack('<3f2H', *base, rnd.randrange(1024), rnd.randrange(1024))
+        chunks.append(bytes(vertices))
+
+    return b''.join(rnd.choice(chunks) for _ in range(size // len(chunks[0]) + 1))[:size]
+
+
+def _texture_data(rnd: random.Random, size: int) -> bytes:
+    # half noise (incompressible), half flat color blocks
+    block = bytes(rnd.randrange(256) for _ in range(256)) * 64
+    chunks = []
+    total = 0
+    while total < size:
+        chunk = rnd.randbytes(16 * 1024) if rnd.random() < 0.5 else block
+        chunks.append(chunk)
+        total += len(chunk)
+
+    return b''.join(chunks)[:size]
+
+
+def generate_corpus(path: Path, scale: float = 1.0, seed: int = CORPUS_SEED) -> None:
+    '''
+    ### Write synthetic game-like tree: many tiny configs, mid-size meshes and a few large textures.
+
+    Content depends on `seed` and `scale` only, so corpora are identical between runs.
+    '''
+    rnd = random.Random(seed)
+
+    for i in range(max(1, int(3000 * scale))):
+        folder = path.joinpath('configs', f'nation_{i % 12}', f'group_{i % 40}')
+        folder.mkdir(parents=True, exist_ok=True)
+        folder.joinpath(f'item_{i}.yaml').write_bytes(_config_text(rnd))
+
+    for i in range(max(1, int(60 * scale))):
+        folder = path.joinpath('models', f'pack_{i % 6}')
+        folder.mkdir(parents=True, exist_ok=True)
+        folder.joinpath(f'mesh_{i}.sc2').write_bytes(_mesh_data(rnd, rnd.randrange(64 * 1024, 2 * 1024 * 1024)))
+
+    for i in range(max(1, int(3 * scale))):
+        folder = path.joinpath('textures')
+        folder.mkdir(parents=True, exist_ok=True)
+        folder.joinpath(f'atlas_{i}.dds').write_bytes(_texture_data(rnd, rnd.randrange(16, 48) * 1024 * 1024))
+
+
+def _measure(name: str, func: Callable[[], Any], repeat: int) -> tuple[BenchResult, Any]:
+    '''
+    ### Run `func` `repeat` times, keep best time and worst peak RSS. Sizes are filled by the caller.
+    '''
+    seconds = float('inf')
+    peak = 0
+    value = None
+
+    for _ in range(max(1, repeat)):
+        with RSSSampler() as sampler:
+            start_time = time.perf_counter()
+            value = func()
+            seconds = min(seconds, time.perf_counter() - start_time)
+        peak = max(peak, sampler.peak)
+
+    return BenchResult(name, 0, 0, max(seconds, 1e-9), 0.0, 0.0, round(peak / 1024 / 1024, 1)), value
+
+
+def _add_result(results: list[BenchResult], result: BenchResult, files: int, size: int) -> None:
+    result.files = files
+    result.bytes = size
+    result.files_per_s = round(files / result.seconds, 1)
+    result.mb_per_s = round(size / result.seconds / 1024 / 1024, 2)
+    result.seconds = round(result.seconds, 4)
+    results.append(result)
+
+
+def run_benchmark(
+        corpus_path: Optional[Path] = None,
+        scale: float = 1.0,
+        jobs: int = 1,
+        executor: str = 'thread',
+        compression_types: Optional[list[CompressionTypes]] = None,
+        repeat: int = 3
+    ) -> dict[str, Any]:
+    '''
+    ### Time scan, pack per compression type, verify and unpack on a synthetic corpus.
+
+    Every stage runs `repeat` times and the best time is reported. Returns JSON-ready report.
+    Corpus is generated in a temporary folder if `corpus_path` is None (or does not exist yet),
+    work folders are always temporary.
+    '''
+    compression_types = compression_types if compression_types is not None else list(CompressionTypes)
+    work_path = Path(tempfile.mkdtemp(prefix='dvpl_bench_'))
+    results: list[BenchResult] = []
+
+    try:
+        if corpus_path is None:
+            corpus_path = work_path.joinpath('corpus')
+
+        if not corpus_path.exists():
+            generate_corpus(corpus_path, scale)
+
+        result, folder = _measure('scan', lambda: Folder(corpus_path), repeat)
+        files = folder.files_count
+        size = sum(x.stat().st_size for x in folder.file_list)
+        _add_result(results, result, files, 0)
+
+        for compression_type in compression_types:
+            options = EngineOptions(fast_mode=True, compression_type=compression_type, jobs=jobs, executor=executor)
+            engine = DVPLEngine(options)
+            name = compression_type.name
+            packed_path = work_path.joinpath(f'packed_{name}')
+            unpacked_path = work_path.joinpath(f'unpacked_{name}')
+
+            result, pack_result = _measure(f'pack_{name}', lambda: engine.pack_folder(folder, packed_path), repeat)
+            _add_result(results, result, files, size)
+
+            packed_folder = Folder(packed_path)
+
+            result, _ = _measure(f'verify_{name}', lambda: engine.verify_folder(packed_folder), repeat)
+            _add_result(results, result, files, pack_result.output_bytes)
+
+            result, _ = _measure(f'unpack_{name}', lambda: engine.unpack_folder(packed_folder, unpacked_path), repeat)
+            _add_result(results, result, files, size)
+
+            shutil.rmtree(packed_path, ignore_errors=True)
+            shutil.rmtree(unpacked_path, ignore_errors=True)
+    finally:
+        shutil.rmtree(work_path, ignore_errors=True)
+
+    return {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'jobs': jobs,
+            'executor': executor,
+            'scale': scale,
+            'repeat': repeat,
+            'corpus_files': files,
+            'corpus_bytes': size,
+        },
+        'results': [asdict(x) for x in results],
+    }
+
+
+def compare_reports(report: dict[str, Any], baseline: dict[str, Any], threshold: float = 0.1) -> list[str]:
+    '''
+    ### List benchmarks which are slower than `baseline` by more than `threshold` (0.1 = 10%)
+    '''
+    baseline_results = {x['name']: x for x in baseline.get('results', [])}
+    regressions = []
+
+    for result in report['results']:
+        base = baseline_results.get(result['name'])
+        if base is None or not base['seconds']:
+            continue
+
+        change = result['seconds'] / base['seconds'] - 1
+        if change > threshold:
+            regressions.append(f"{result['name']}: {base['seconds']:.3f} s -> {result['seconds']:.3f} s (+{change * 100:.1f}%)")
+
+    return regressions
+
+
+def load_report(path: Path) -> dict[str, Any]:
+    return json.loads(path.read_text(encoding='utf-8'))
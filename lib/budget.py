@@ -0,0 +1,54 @@
+from collections.abc import Callable
+from threading import Condition
+from typing import Optional
+
+
+class MemoryBudget:
+    '''
+    ### Admission of file jobs by projected memory footprint.
+
+    Jobs which do not fit wait until running jobs release memory. A job larger than
+    the whole budget is admitted when nothing else is in flight, so it never stalls.
+    `limit` None admits everything.
+    '''
+    def __init__(self, limit: Optional[int] = None) -> None:
+        self.limit = limit
+        self.used = 0
+        self.peak = 0
+        '''
+        ### Max projected footprint of in-flight jobs
+        '''
+        self.condition = Condition()
+
+    def _fits(self, size: int) -> bool:
+        return self.limit is None or self.used == 0 or self.used + size <= self.limit
+
+    def _take(self, size: int) -> None:
+        self.used += size
+        self.peak = max(self.peak, self.used)
+
+    def try_acquire(self, size: int) -> bool:
+        with self.condition:
+            if not self._fits(size):
+                return False
+
+            self._take(size)
+            return True
+
+    def acquire(self, size: int, canceled: Callable[[], bool]) -> bool:
+        '''
+        ### Wait until `size` bytes fit, returns False if `canceled()` became true while waiting
+        '''
+        with self.condition:
+            while not self._fits(size):
+                if canceled():
+                    return False
+                self.condition.wait(0.1)
+
+            self._take(size)
+            return True
+
+    def release(self, size: int) -> None:
+        with self.condition:
+            self.used -= size
+            self.condition.notify_all()
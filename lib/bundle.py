@@ -0,0 +1,237 @@
+import json
+import os
+from dataclasses import dataclass
+from pathlib import Path, PurePosixPath, PureWindowsPath
+from struct import pack, unpack
+from threading import Lock
+from typing import BinaryIO, Optional
+
+from lib.dvp_struct import DVPLFooter, parse_footer
+from lib.io_utils import copy_range
+from lib.reader import DecodeCache, DVPLReader
+
+BUNDLE_MAGIC = b'DVPB'
+BUNDLE_VERSION = 1
+BUNDLE_SUFFIX = '.dvplb'
+
+BUNDLE_TRAILER_SIZE = 20
+'''
+### Index offset (8 bytes), index size (8 bytes) and `BUNDLE_MAGIC`
+'''
+
+
+def entry_target(target_path: Path, name: str) -> Path:
+    '''
+    ### Path of entry `name` inside `target_path`, raises ValueError if the name points outside of it
+    '''
+    if not name or PurePosixPath(name).is_absolute() or PureWindowsPath(name).drive or name.startswith('\\'):
+        raise ValueError(f'Invalid bundle entry name: {name}')
+
+    root = target_path.resolve()
+    target = root.joinpath(name).resolve()
+
+    if target == root or not target.is_relative_to(root):
+        raise ValueError(f'Invalid bundle entry name: {name}')
+
+    return target
+
+
+@dataclass
+class BundleEntry:
+    offset: int
+    size: int
+    '''
+    ### DVPL file size, footer included
+    '''
+
+
+class BundleWriter:
+    '''
+    ### Single-file archive of DVPL files: header, DVPL files one after another, central index, trailer.
+
+    Entries are whole DVPL files (compressed block and footer), so any entry can be copied out
+    or read in place. Index is JSON `{"entries": [[name, offset, size], ...]}`, names are paths
+    relative to `root` (POSIX form). Thread-safe, data goes to a temporary file which replaces
+    `path` on `close(finished=True)`.
+    '''
+    def __init__(self, path: Path, root: Path) -> None:
+        self.path = path
+        self.root = root
+        self.temp_path = path.with_name(path.name + '.tmp')
+        self.entries: dict[str, BundleEntry] = {}
+        self.lock = Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.file: Optional[BinaryIO] = open(self.temp_path, 'wb')
+        self.file.write(BUNDLE_MAGIC + pack('<I', BUNDLE_VERSION))
+
+    def name(self, target: Path) -> str:
+        return target.relative_to(self.root).as_posix()
+
+    def add(self, target: Path, data: bytes | memoryview, footer: bytes) -> int:
+        '''
+        ### Append DVPL file with compressed block `data`, returns written bytes count
+        '''
+        name = self.name(target)
+
+        with self.lock:
+            offset = self._start(name)
+            written = self.file.write(data)
+            written += self.file.write(footer)
+            self.entries[name] = BundleEntry(offset, written)
+
+        return written
+
+    def add_copy(self, target: Path, source: Path, size: int, footer: bytes) -> int:
+        '''
+        ### Append DVPL file with stored block copied kernel-side from `source`, returns written bytes count
+        '''
+        name = self.name(target)
+
+        with self.lock, open(source, 'rb') as source_file:
+            offset = self._start(name)
+            self.file.flush()
+            written = copy_range(source_file.fileno(), self.file.fileno(), size)
+            self.file.seek(0, os.SEEK_END)
+
+            if written != size:
+                # drop the partial entry, the next one starts at the same offset
+                self.file.truncate(offset)
+                self.file.seek(offset)
+                raise ValueError(f'File changed while copying: {source}')
+
+            written += self.file.write(footer)
+            self.entries[name] = BundleEntry(offset, written)
+
+        return written
+
+    def _start(self, name: str) -> int:
+        if self.file is None:
+            raise ValueError(f'Bundle is closed: {self.path}')
+
+        if name in self.entries:
+            raise ValueError(f'Duplicate bundle entry: {name}')
+
+        return self.file.tell()
+
+    def close(self, finished: bool = True) -> None:
+        '''
+        ### Write index and trailer and replace `path`, bundle of unfinished job is removed
+        '''
+        with self.lock:
+            if self.file is None:
+                return
+
+            file = self.file
+            self.file = None
+
+        try:
+            if finished:
+                index = json.dumps(
+                    {'entries': [[k, v.offset, v.size] for k, v in self.entries.items()]}, separators=(',', ':')
+                ).encode('utf-8')
+                index_offset = file.tell()
+                file.write(index)
+                file.write(pack('<QQ', index_offset, len(index)) + BUNDLE_MAGIC)
+                file.flush()
+                os.fsync(file.fileno())
+        finally:
+            file.close()
+
+        if finished:
+            os.replace(self.temp_path, self.path)
+        else:
+            self.temp_path.unlink(missing_ok=True)
+
+    def __enter__(self) -> 'BundleWriter':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close(exc_type is None)
+
+
+class BundleReader:
+    '''
+    ### Random access to entries of a bundle written by `BundleWriter`
+    '''
+    def __init__(self, path: Path) -> None:
+        self.path = path
+
+        with open(path, 'rb') as file:
+            header = file.read(8)
+            if len(header) != 8 or header[:4] != BUNDLE_MAGIC:
+                raise ValueError(f'Not a DVPL bundle: {path}')
+
+            if unpack('<I', header[4:])[0] != BUNDLE_VERSION:
+                raise ValueError(f'Unsupported bundle version: {path}')
+
+            file_size = file.seek(0, os.SEEK_END)
+            if file_size < 8 + BUNDLE_TRAILER_SIZE:
+                raise ValueError(f'Bundle is truncated: {path}')
+
+            file.seek(-BUNDLE_TRAILER_SIZE, os.SEEK_END)
+            trailer = file.read(BUNDLE_TRAILER_SIZE)
+            index_offset, index_size = unpack('<QQ', trailer[:16])
+
+            if trailer[16:] != BUNDLE_MAGIC or index_offset + index_size + BUNDLE_TRAILER_SIZE != file_size:
+                raise ValueError(f'Bundle is truncated: {path}')
+
+            file.seek(index_offset)
+            index = json.loads(file.read(index_size).decode('utf-8'))
+
+        self.entries: dict[str, BundleEntry] = {name: BundleEntry(offset, size) for name, offset, size in index['entries']}
+
+    def names(self) -> list[str]:
+        return list(self.entries)
+
+    def entry(self, name: str) -> BundleEntry:
+        entry = self.entries.get(name)
+
+        if entry is None:
+            raise ValueError(f'Bundle entry not found: {name}')
+
+        return entry
+
+    def footer(self, name: str) -> DVPLFooter:
+        entry = self.entry(name)
+
+        with open(self.path, 'rb') as file:
+            file.seek(entry.offset + entry.size - 20)
+            return parse_footer(file.read(20))
+
+    def read_dvpl(self, name: str) -> bytes:
+        '''
+        ### Whole DVPL file of entry `name`
+        '''
+        entry = self.entry(name)
+
+        with open(self.path, 'rb') as file:
+            file.seek(entry.offset)
+            return file.read(entry.size)
+
+    def open(self, name: str, cache: Optional[DecodeCache] = None) -> DVPLReader:
+        '''
+        ### Read unpacked content of entry `name` in place, see `DVPLReader`
+        '''
+        entry = self.entry(name)
+        return DVPLReader(self.path, cache, entry.offset, entry.size)
+
+    def extract(self, target_path: Path, names: Optional[list[str]] = None) -> int:
+        '''
+        ### Write entries back as DVPL files into `target_path`, returns written files count
+        '''
+        count = 0
+        # check every name before writing anything
+        targets = [(self.entry(name), entry_target(target_path, name)) for name in (names if names is not None else self.names())]
+
+        with open(self.path, 'rb') as file:
+            for entry, target in targets:
+                target.parent.mkdir(parents=True, exist_ok=True)
+
+                with open(target, 'wb') as new_file:
+                    if copy_range(file.fileno(), new_file.fileno(), entry.size, entry.offset) != entry.size:
+                        raise ValueError(f'Bundle is truncated: {self.path}')
+
+                count += 1
+
+        return count
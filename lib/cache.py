@@ -0,0 +1,182 @@
+import os
+import shutil
+from collections import OrderedDict
+from pathlib import Path
+from threading import Event, Lock
+from typing import Optional
+
+from lib.dvp_struct import DVPLFooter, CompressionTypes, read_footer
+
+_shared_caches: dict[tuple[Optional[str], int], 'CompressionCache'] = {}
+_shared_lock = Lock()
+
+
+def shared_cache(path: Optional[str], max_size: int) -> 'CompressionCache':
+    '''
+    ### Process-wide cache instance, used to rebuild the cache in process pool workers
+    '''
+    with _shared_lock:
+        key = (path, max_size)
+        if key not in _shared_caches:
+            _shared_caches[key] = CompressionCache(Path(path) if path is not None else None, max_size)
+
+        return _shared_caches[key]
+
+
+class CompressionCache:
+    '''
+    ### Content-addressed cache of packed DVPL files, key is (content hash, compression type).
+
+    In-run entries point to already written outputs, so the cache holds no file data in memory.
+    With `path` packed files are also kept on disk, total size is bounded by `max_size`
+    with LRU eviction (file mtime is the last use time).
+    Content being packed is registered as pending by `copy_to`, so jobs with the same content
+    running at the same time wait for the first one instead of compressing it again.
+    '''
+    def __init__(self, path: Optional[Path] = None, max_size: int = 1 << 30) -> None:
+        self.path = path
+        self.max_size = max_size
+        self.lock = Lock()
+        self.outputs: dict[str, tuple[Path, DVPLFooter]] = {}
+        self.disk_entries: OrderedDict[str, int] = OrderedDict()
+        self.disk_size = 0
+        self.pending: dict[str, Event] = {}
+
+        if self.path is not None:
+            self.path.mkdir(parents=True, exist_ok=True)
+            self._load_disk_entries()
+
+    def __reduce__(self):
+        return shared_cache, (str(self.path) if self.path is not None else None, self.max_size)
+
+    @staticmethod
+    def make_key(digest: str, compression_type: CompressionTypes) -> str:
+        return f'{digest}.{compression_type.name}'
+
+    def _load_disk_entries(self) -> None:
+        entries = []
+        for entry in os.scandir(self.path):
+            if entry.is_file() and entry.name.endswith('.dvpl'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime_ns, entry.name.removesuffix('.dvpl'), stat.st_size))
+
+        for _, key, size in sorted(entries):
+            self.disk_entries[key] = size
+            self.disk_size += size
+
+    def copy_to(self, digest: str, compression_type: CompressionTypes, target: Path) -> Optional[DVPLFooter]:
+        '''
+        ### Write cached DVPL file for the content into `target`, returns its footer or None on cache miss.
+
+        If the same content is being packed by another job, waits for it. On a miss the caller
+        owns the content and must call `add` or `release`.
+        '''
+        key = self.make_key(digest, compression_type)
+
+        while True:
+            with self.lock:
+                output = self.outputs.get(key)
+                on_disk = key in self.disk_entries
+                if on_disk:
+                    self.disk_entries.move_to_end(key)
+
+                if output is not None or on_disk:
+                    break
+
+                event = self.pending.get(key)
+                if event is None:
+                    self.pending[key] = Event()
+                    return None
+
+            event.wait()
+
+        if output is not None:
+            source, footer = output
+            try:
+                if source.stat().st_size == footer.compressed_block_size + 20:
+                    shutil.copyfile(source, target)
+                    return footer
+            except OSError:
+                pass
+
+        if on_disk:
+            cached_file = self.path.joinpath(key + '.dvpl')
+            try:
+                footer = read_footer(cached_file)
+                shutil.copyfile(cached_file, target)
+                os.utime(cached_file)
+            except (OSError, ValueError):
+                with self.lock:
+                    self.disk_size -= self.disk_entries.pop(key, 0)
+                return None
+
+            with self.lock:
+                self.outputs[key] = (target, footer)
+
+            return footer
+
+        return None
+
+    def add(self, digest: str, compression_type: CompressionTypes, target: Path, footer: DVPLFooter) -> None:
+        '''
+        ### Remember packed file `target`, store a copy on disk if the cache is persistent
+        '''
+        key = self.make_key(digest, compression_type)
+
+        with self.lock:
+            self.outputs[key] = (target, footer)
+            event = self.pending.pop(key, None)
+            if event is not None:
+                event.set()
+
+            if self.path is None or key in self.disk_entries:
+                return
+
+        size = footer.compressed_block_size + 20
+
+        if size > self.max_size:
+            return
+
+        cached_file = self.path.joinpath(key + '.dvpl')
+        temp_file = cached_file.with_name(f'{cached_file.name}.{os.getpid()}.tmp')
+        try:
+            shutil.copyfile(target, temp_file)
+            os.replace(temp_file, cached_file)
+        except OSError:
+            temp_file.unlink(missing_ok=True)
+            return
+
+        with self.lock:
+            self.disk_entries[key] = size
+            self.disk_size += size
+            self._evict()
+
+    def release(self, digest: str, compression_type: CompressionTypes) -> None:
+        '''
+        ### Content was not packed (error), one of the waiting jobs packs it instead
+        '''
+        with self.lock:
+            event = self.pending.pop(self.make_key(digest, compression_type), None)
+
+        if event is not None:
+            event.set()
+
+    def release_pending(self) -> None:
+        '''
+        ### Wake all waiting jobs, called when a folder job ends
+        '''
+        with self.lock:
+            events = list(self.pending.values())
+            self.pending.clear()
+
+        for event in events:
+            event.set()
+
+    def _evict(self) -> None:
+        while self.disk_size > self.max_size and self.disk_entries:
+            key, size = self.disk_entries.popitem(last=False)
+            self.disk_size -= size
+            try:
+                self.path.joinpath(key + '.dvpl').unlink()
+            except OSError:
+                pass
@@ -0,0 +1,144 @@
+import zlib
+from typing import Literal, Union
+
+import lz4.block
+
+from lib.dvp_struct import DVPLFooter, CompressionTypes
+
+AUTO_COMPRESSION = 'AUTO'
+'''
+### Pack option value: choose compression type per file, see `choose_compression`
+'''
+
+CompressionMode = Union[CompressionTypes, Literal['AUTO']]
+
+INCOMPRESSIBLE_EXTENSIONS = {
+    '.ogg', '.mp3', '.webm', '.mp4',
+    '.webp', '.png', '.jpg', '.jpeg', '.pvr', '.ktx', '.astc',
+    '.zip', '.gz', '.bz2', '.xz', '.7z',
+}
+'''
+### Already compressed formats, stored as is in auto mode
+'''
+
+SAMPLE_SIZE = 64 * 1024
+'''
+### Size of each of 3 samples (start, middle, end) used for trial compression
+'''
+
+RATIO_THRESHOLD = 0.9
+'''
+### Files which do not compress below this ratio are stored as is
+'''
+
+HC_SIZE_LIMIT = 32 * 1024 * 1024
+'''
+### Files larger than this get LZ4 instead of slow LZ4_HC
+'''
+
+DEFLATE_LEVEL = 9
+'''
+### zlib compression level for RFC1951 packing
+'''
+
+
+def parse_compression(name: str) -> CompressionMode:
+    if name == AUTO_COMPRESSION:
+        return AUTO_COMPRESSION
+
+    return CompressionTypes[name]
+
+
+def compression_name(mode: CompressionMode) -> str:
+    '''
+    ### Name of compression type or `AUTO_COMPRESSION`, inverse of `parse_compression`
+    '''
+    return mode if isinstance(mode, str) else mode.name
+
+
+def compress_block(data: bytes | memoryview, compression_type: CompressionTypes) -> bytes | memoryview:
+    if compression_type is CompressionTypes.NONE:
+        return data
+
+    if compression_type is CompressionTypes.RFC1951:
+        compressor = zlib.compressobj(DEFLATE_LEVEL, zlib.DEFLATED, -zlib.MAX_WBITS)
+        return compressor.compress(data) + compressor.flush()
+
+    return lz4.block.compress(
+        data,
+        store_size=False,
+        mode='high_compression' if compression_type is CompressionTypes.LZ4_HC else 'default'
+    )
+
+
+def decompress_block(data: bytes | memoryview, footer: DVPLFooter) -> bytes | memoryview:
+    '''
+    ### Decompress DVPL block described by `footer`, NONE block is returned as is.
+
+    Raises ValueError if the block is damaged or has unexpected size.
+    '''
+    compression_type = footer.compression_type
+
+    if compression_type is CompressionTypes.NONE:
+        return data
+
+    if compression_type is CompressionTypes.RFC1951:
+        try:
+            result = zlib.decompress(data, -zlib.MAX_WBITS, max(footer.input_file_size, 1))
+        except zlib.error:
+            try:
+                # some tools write zlib / gzip wrapped streams, header is detected automatically
+                result = zlib.decompress(data, zlib.MAX_WBITS | 32, max(footer.input_file_size, 1))
+            except zlib.error as e:
+                raise ValueError(f'RFC1951 decompression failed: {e}') from e
+
+        if len(result) != footer.input_file_size:
+            raise ValueError(f'Decompressed {len(result)} bytes, but {footer.input_file_size} bytes expected')
+
+        return result
+
+    try:
+        return lz4.block.decompress(data, footer.input_file_size)
+    except lz4.block.LZ4BlockError as e:
+        raise ValueError(f'LZ4 decompression failed: {e}') from e
+
+
+def is_incompressible(name: str) -> bool:
+    '''
+    ### File `name` is a known compressed format, see `INCOMPRESSIBLE_EXTENSIONS`
+    '''
+    return any(name.lower().endswith(x) for x in INCOMPRESSIBLE_EXTENSIONS)
+
+
+def choose_compression(name: str, data: bytes | memoryview) -> CompressionTypes:
+    '''
+    ### Choose compression type for file `name` with content `data`.
+
+    Known compressed formats are stored as is, other files are trial-compressed
+    with fast LZ4 on up to 3 samples: poor ratio gives NONE, large files get LZ4, others LZ4_HC.
+    '''
+    if is_incompressible(name):
+        return CompressionTypes.NONE
+
+    size = len(data)
+
+    if size == 0:
+        return CompressionTypes.NONE
+
+    if size <= SAMPLE_SIZE * 3:
+        samples = [data]
+    else:
+        view = memoryview(data)
+        middle = (size - SAMPLE_SIZE) // 2
+        samples = [view[:SAMPLE_SIZE], view[middle:middle + SAMPLE_SIZE], view[-SAMPLE_SIZE:]]
+
+    sample_size = sum(len(x) for x in samples)
+    compressed_size = sum(len(lz4.block.compress(x, store_size=False)) for x in samples)
+
+    if compressed_size / sample_size > RATIO_THRESHOLD:
+        return CompressionTypes.NONE
+
+    if size > HC_SIZE_LIMIT:
+        return CompressionTypes.LZ4
+
+    return CompressionTypes.LZ4_HC
@@ -0,0 +1,219 @@
+import os
+import time
+import zlib
+from collections.abc import Iterator
+from contextlib import contextmanager
+from mmap import ACCESS_READ, mmap
+from pathlib import Path, PurePosixPath
+from struct import unpack
+from typing import BinaryIO, Optional
+from zipfile import ZIP_DEFLATED, ZIP_STORED, ZipFile, ZipInfo, is_zipfile
+
+from lib.data_classes import FolderMeta
+from lib.dvp_struct import SERVICE_FILE_PREFIX, parse_footer
+from lib.io_utils import COPY_CHUNK_SIZE
+
+CONTAINER_SUFFIXES = {'.apk', '.obb', '.zip', '.xapk'}
+'''
+### Zip-family containers which can be unpacked without staging to disk
+'''
+
+
+def is_container(path: Path) -> bool:
+    return path.suffix.lower() in CONTAINER_SUFFIXES and path.is_file() and is_zipfile(path)
+
+
+def member_data_offset(file: BinaryIO, info: ZipInfo) -> int:
+    '''
+    ### Offset of member data in the container, the local header may differ from the central one
+    '''
+    file.seek(info.header_offset)
+    header = file.read(30)
+
+    if len(header) != 30 or header[:4] != b'PK\x03\x04':
+        raise ValueError(f'Bad zip local header: {info.filename}')
+
+    name_size, extra_size = unpack('<HH', header[26:30])
+    return info.header_offset + 30 + name_size + extra_size
+
+
+class ZipEntryStruct:
+    '''
+    ### DVPL file inside a zip container, same interface as `DVPLFooterStruct`.
+
+    Stored members are read in place: the footer by seek, the payload by offset.
+    Deflated members are inflated from the container stream (CRC32 of the member is checked).
+    With `keep` the inflated member is kept until its payload is mapped, so it is inflated once,
+    otherwise only the footer is kept and the member is inflated again for the payload.
+    '''
+    def __init__(self, container: Path, info: ZipInfo, keep: bool = True) -> None:
+        self.container = container
+        self.info = info
+        self.file_size = info.file_size
+        self.zip_stored = info.compress_type == ZIP_STORED
+
+        self._data: Optional[bytes] = None
+        '''
+        ### Inflated deflated member, dropped after `map_payload`
+        '''
+
+        if self.file_size < 20:
+            raise ValueError('Invalid last bytes length')
+
+        if info.flag_bits & 0x1:
+            raise ValueError(f'Encrypted zip member: {info.filename}')
+
+        if info.compress_type not in (ZIP_STORED, ZIP_DEFLATED):
+            raise ValueError(f'Unsupported zip compression {info.compress_type}: {info.filename}')
+
+        with open(container, 'rb') as file:
+            self.data_offset = member_data_offset(file, info)
+
+            if self.zip_stored:
+                file.seek(self.data_offset + self.file_size - 20)
+                last_bytes = file.read(20)
+            else:
+                data = self._inflate(file, keep)
+                self._data = data if keep else None
+                last_bytes = data[-20:]
+
+        self.last_bytes = last_bytes
+        '''
+        ### 20 last bytes of DVPL file
+        '''
+        self.footer_data = parse_footer(last_bytes)
+
+    def _inflate(self, file: BinaryIO, keep: bool = True) -> bytes:
+        '''
+        ### Inflate member data, with `keep` False only 20 last bytes are returned.
+
+        Raises ValueError if the member size or CRC32 does not match the zip entry.
+        '''
+        decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+        chunks: list[bytes] = []
+        tail = b''
+        size = 0
+        checksum = 0
+        left = self.info.compress_size
+        file.seek(self.data_offset)
+
+        try:
+            while left > 0:
+                chunk = file.read(min(COPY_CHUNK_SIZE, left))
+                if not chunk:
+                    break
+
+                left -= len(chunk)
+                data = decompressor.decompress(chunk)
+                size += len(data)
+                checksum = zlib.crc32(data, checksum)
+
+                if keep:
+                    chunks.append(data)
+                else:
+                    tail = (tail + data[-20:])[-20:]
+
+            data = decompressor.flush()
+        except zlib.error as e:
+            raise ValueError(f'Zip member is damaged: {self.info.filename}') from e
+
+        size += len(data)
+        checksum = zlib.crc32(data, checksum)
+
+        if size != self.file_size or checksum != self.info.CRC:
+            raise ValueError(f'Zip member is damaged: {self.info.filename}')
+
+        return b''.join(chunks) + data if keep else (tail + data[-20:])[-20:]
+
+    def _inflated(self) -> bytes:
+        if self._data is None:
+            with open(self.container, 'rb') as file:
+                self._data = self._inflate(file)
+
+        return self._data
+
+    def read_payload(self) -> bytes:
+        '''
+        ### Read compressed block (member content without footer)
+        '''
+        if not self.zip_stored:
+            return self._inflated()[:-20]
+
+        with open(self.container, 'rb') as file:
+            file.seek(self.data_offset)
+            return file.read(self.file_size - 20)
+
+    @contextmanager
+    def map_payload(self) -> Iterator[memoryview]:
+        '''
+        ### Yield compressed block as `memoryview`, stored member is memory-mapped from the container
+
+        The view is released on exit, do not keep references to it.
+        '''
+        if not self.zip_stored:
+            with memoryview(self._inflated()) as view, view[:-20] as payload:
+                yield payload
+
+            self._data = None
+            return
+
+        with open(self.container, 'rb') as file, mmap(file.fileno(), 0, access=ACCESS_READ) as mapped:
+            with memoryview(mapped) as view, view[self.data_offset:self.data_offset + self.file_size - 20] as payload:
+                yield payload
+
+
+class ZipContainer:
+    '''
+    ### Zip-family container (APK, OBB, zip) used as a folder job source, unpack only.
+
+    Members under `root` (e.g. `assets/Data/`) are listed as virtual paths `path / member name`,
+    so targets are built like for a folder. Members with unsafe names are ignored.
+    '''
+    def __init__(self, path: Path, root: str = '') -> None:
+        start_time = time.perf_counter()
+        self.path = path
+        self.root = root.strip('/') + '/' if root.strip('/') else ''
+        self.members: dict[Path, ZipInfo] = {}
+        stat = path.stat()
+        self.mtime_ns = stat.st_mtime_ns
+        '''
+        ### Container modification time, used as the time of every member
+        '''
+
+        with ZipFile(path) as archive:
+            infos = archive.infolist()
+
+        folders: set[PurePosixPath] = set()
+        for info in infos:
+            name = info.filename
+
+            if info.is_dir() or not name.startswith(self.root):
+                continue
+
+            relative = PurePosixPath(name[len(self.root):])
+
+            if relative.is_absolute() or '..' in relative.parts or relative.name.startswith(SERVICE_FILE_PREFIX):
+                continue
+
+            self.members[path.joinpath(*relative.parts)] = info
+            folders.update(relative.parents)
+
+        dvpl_count = sum(1 for x in self.members if x.name.endswith('.dvpl'))
+        self.folder_meta = FolderMeta(path, len(self.members) - dvpl_count, dvpl_count, max(0, len(folders) - 1))
+        self.scan_time = time.perf_counter() - start_time
+
+    def dvpl_files(self) -> list[Path]:
+        return [x for x in self.members if x.name.endswith('.dvpl')]
+
+    def files(self) -> list[Path]:
+        return [x for x in self.members if not x.name.endswith('.dvpl')]
+
+    def stat(self, path: Path) -> os.stat_result:
+        '''
+        ### Member size with container modification time
+        '''
+        mtime = self.mtime_ns // 1_000_000_000
+        return os.stat_result(
+            (0o100644, 0, 0, 1, 0, 0, self.members[path].file_size, mtime, mtime, mtime),
+            {'st_mtime_ns': self.mtime_ns}
+        )
@@ -1,11 +1,22 @@
+import os
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
 from dataclasses import dataclass
-from io import BufferedIOBase
+from io import BufferedIOBase, SEEK_END
 from enum import Enum
+from mmap import mmap, ACCESS_READ
 from pathlib import Path
 from struct import pack
+from typing import Optional
 
 from lib.data_classes import FolderMeta
 
+SERVICE_FILE_PREFIX = '.dvpl_'
+'''
+### Files with this prefix belong to the tool (manifests etc.) and are never packed
+'''
+
 
 class CompressionTypes(Enum):
     NONE = 0
@@ -38,52 +49,167 @@ class DVPLFooter:
     '''
 
 
+class TreeWalker:
+    '''
+    ### Lazy `os.scandir` walk of a folder tree.
+    
+    Files are yielded as soon as they are found, `folder_meta` counters grow while walking.
+    Unreadable folders are skipped, symlinked folders are not followed.
+    '''
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.folder_meta = FolderMeta(self.path, 0, 0, 0)
+        self.scan_time = 0.0
+        '''
+        ### Time spent in the walk itself, consumer time between files is not counted
+        '''
+
+    def walk(self) -> Iterator[tuple[Path, bool]]:
+        '''
+        ### Yield (file path, is DVPL file) for every file of the tree
+        '''
+        meta = self.folder_meta
+        meta.files_count = meta.dvpl_count = meta.folders_count = 0
+        stack = [str(self.path)]
+        self.scan_time = 0.0
+        start_time = time.perf_counter()
+        
+        while stack:
+            try:
+                with os.scandir(stack.pop()) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            meta.folders_count += 1
+                            stack.append(entry.path)
+                            continue
+                        
+                        if not entry.is_file() or entry.name.startswith(SERVICE_FILE_PREFIX):
+                            continue
+                        
+                        is_dvpl = entry.name.endswith('.dvpl')
+                        if is_dvpl:
+                            meta.dvpl_count += 1
+                        else:
+                            meta.files_count += 1
+
+                        self.scan_time += time.perf_counter() - start_time
+                        yield Path(entry.path), is_dvpl
+                        start_time = time.perf_counter()
+            except (PermissionError, FileNotFoundError, NotADirectoryError):
+                continue
+
+        self.scan_time += time.perf_counter() - start_time
+
+    def dvpl_files(self) -> Iterator[Path]:
+        return (path for path, is_dvpl in self.walk() if is_dvpl)
+
+    def files(self) -> Iterator[Path]:
+        return (path for path, is_dvpl in self.walk() if not is_dvpl)
+
+
 class Folder:
     def __init__(self, path: Path) -> None:
         self.path = path
-        self.glob_files = self.path.glob("**/*")
         
         dvpl_paths: list[Path] = []
         file_paths: list[Path] = []
-        folder_paths: list[Path] = []
         
-        for i in self.glob_files:
-            file_path = Path(i)
-            
-            if not file_path.is_file():
-                folder_paths.append(file_path)
-                continue
-            
-            if file_path.suffix == ".dvpl":
+        walker = TreeWalker(self.path)
+        for file_path, is_dvpl in walker.walk():
+            if is_dvpl:
                 dvpl_paths.append(file_path)
             else:
                 file_paths.append(file_path)
         
         self.dvpl_file_list = dvpl_paths
         self.file_list = file_paths
-        self.folder_paths = folder_paths
         
-        self.files_count = len(self.file_list)
-        self.dvpl_count = len(self.dvpl_file_list)
-        self.folders_count = len(self.folder_paths)
+        self.files_count = walker.folder_meta.files_count
+        self.dvpl_count = walker.folder_meta.dvpl_count
+        self.folders_count = walker.folder_meta.folders_count
         
-        self.folder_meta = FolderMeta(self.path, self.files_count, self.dvpl_count, self.folders_count)
+        self.folder_meta = walker.folder_meta
+        self.scan_time = walker.scan_time
+
+    def dvpl_files(self) -> list[Path]:
+        return self.dvpl_file_list
+
+    def files(self) -> list[Path]:
+        return self.file_list
 
     
 class DVPLFooterStruct:
     def __init__(self, file: BufferedIOBase) -> None:
-        self.data = file.read()
-        footer = self.data[-20:]
+        '''
+        ### Parse footer only, payload is read on demand (see `read_payload`)
+        '''
+        self.file_size = file.seek(0, SEEK_END)
+        
+        if self.file_size < 20:
+            raise ValueError('Invalid last bytes length')
+        
+        file.seek(-20, SEEK_END)
+        footer = file.read(20)
         
         if len(footer) != 20:
             raise ValueError('Invalid last bytes length')
         
+        name = getattr(file, 'name', None)
+        self.path: Optional[Path] = Path(name) if isinstance(name, (str, Path)) else None
+        self._data: Optional[bytes] = None
+        
+        if self.path is None:
+            file.seek(0)
+            self._data = file.read()
+        
         self.last_bytes = footer
+        '''
+        ### 20 last bytes of DVPL file
+        '''
         self.footer_data = self._get_footer_metadata()
         file.close()
+
+    @classmethod
+    def from_path(cls, path: Path) -> 'DVPLFooterStruct':
+        with open(path, 'rb') as file:
+            return cls(file)
+
+    @property
+    def data(self) -> bytes:
         '''
-        ### 20 last bytes of DVPL file
+        ### Whole DVPL file content, read on first access
         '''
+        if self._data is None:
+            with open(self.path, 'rb') as file:
+                self._data = file.read()
+        
+        return self._data
+
+    def read_payload(self) -> bytes:
+        '''
+        ### Read compressed block (file content without footer)
+        '''
+        if self._data is not None:
+            return self._data[:-20]
+        
+        with open(self.path, 'rb') as file:
+            return file.read(self.file_size - 20)
+
+    @contextmanager
+    def map_payload(self) -> Iterator[memoryview]:
+        '''
+        ### Memory-map the file and yield compressed block as `memoryview` without copying it
+        
+        The view is released on exit, do not keep references to it.
+        '''
+        if self._data is not None:
+            with memoryview(self._data) as view, view[:-20] as payload:
+                yield payload
+            return
+        
+        with open(self.path, 'rb') as file, mmap(file.fileno(), 0, access=ACCESS_READ) as mapped:
+            with memoryview(mapped) as view, view[:self.file_size - 20] as payload:
+                yield payload
 
     def __str__(self) -> str:
         data = \
@@ -98,19 +224,7 @@ class DVPLFooterStruct:
         return data
 
     def _get_footer_metadata(self) -> DVPLFooter:
-        input_file_size = int.from_bytes(self.last_bytes[0:4], 'little')
-        compressed_block_size = int.from_bytes(self.last_bytes[4:8], 'little')
-        compressed_block_crc32 = int.from_bytes(self.last_bytes[8:12], 'little')
-        compression_type = CompressionTypes(int.from_bytes(self.last_bytes[12:16], 'little'))
-        file_descriptor = self.last_bytes[16:20].decode('utf-8')
-
-        return DVPLFooter(
-            input_file_size=input_file_size,
-            compressed_block_size=compressed_block_size,
-            compressed_block_crc32=compressed_block_crc32,
-            compression_type=compression_type,
-            footer_label=file_descriptor
-        )
+        return parse_footer(self.last_bytes)
     
     @staticmethod
     def generate_footer(input_file_size: int, compressed_block_size: int, compressed_block_crc32: int, compression_type: int, footer_label: str = 'DVPL') -> bytes:
@@ -138,3 +252,32 @@ class DVPLFooterStruct:
         
     def get_footer_data(self) -> DVPLFooter:
         return self.footer_data
+
+
+def parse_footer(last_bytes: bytes) -> DVPLFooter:
+    '''
+    ### Parse 20 last bytes of DVPL file
+    '''
+    if len(last_bytes) != 20:
+        raise ValueError('Invalid last bytes length')
+
+    input_file_size = int.from_bytes(last_bytes[0:4], 'little')
+    compressed_block_size = int.from_bytes(last_bytes[4:8], 'little')
+    compressed_block_crc32 = int.from_bytes(last_bytes[8:12], 'little')
+    compression_type = CompressionTypes(int.from_bytes(last_bytes[12:16], 'little'))
+    file_descriptor = last_bytes[16:20].decode('utf-8')
+
+    return DVPLFooter(
+        input_file_size=input_file_size,
+        compressed_block_size=compressed_block_size,
+        compressed_block_crc32=compressed_block_crc32,
+        compression_type=compression_type,
+        footer_label=file_descriptor
+    )
+
+
+def read_footer(path: Path) -> DVPLFooter:
+    '''
+    ### Read DVPL footer of file `path` without loading the payload
+    '''
+    return DVPLFooterStruct.from_path(path).footer_data
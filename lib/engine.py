@@ -0,0 +1,1494 @@
+import heapq
+import os
+import time
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import ExitStack
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from queue import Empty, Queue
+from threading import Thread
+from typing import Any, Literal, Optional, Union
+from zipfile import ZIP_STORED, ZipInfo
+from zlib import crc32
+
+from lib.budget import MemoryBudget
+from lib.bundle import BundleWriter
+from lib.cache import CompressionCache
+from lib.container import ZipContainer, ZipEntryStruct
+from lib.codec import CompressionMode, choose_compression, compression_name, compress_block, decompress_block, is_incompressible
+from lib.dvp_struct import DVPLFooter, DVPLFooterStruct, CompressionTypes, Folder, TreeWalker
+from lib.index import FooterIndex
+from lib.journal import JobJournal
+from lib.io_utils import COPY_CHUNK_SIZE, copy_range, stream_crc32
+from lib.manifest import PackManifest, content_hash, content_hasher
+from lib.sync import SyncRecord
+from lib.trace import StageStats, StageSummary, StageTimer, TraceWriter
+from lib.verify import VerifyReport, VerifyResult, verify_file
+
+
+FolderSource = Union[Folder, TreeWalker, FooterIndex, ZipContainer]
+'''
+### `Folder` is scanned before the job, `TreeWalker` is scanned while the job runs,
+### `FooterIndex` is loaded from disk and also gives footers for scheduling without opening files,
+### `ZipContainer` lists members of APK / OBB / zip file (unpack only)
+'''
+
+
+STAGE_ORDER = [
+    'scan', 'mkdir', 'footer', 'read', 'hash', 'choose', 'cache',
+    'compress', 'decompress', 'crc32', 'write', 'manifest', 'clean_up', 'file_total',
+]
+'''
+### Stages order in job summary
+'''
+
+ORDER_WINDOW = 256
+'''
+### Files looked ahead when ordering folder jobs by size, the scan is never collected in full
+'''
+
+
+def _noop(*args, **kwargs) -> None:
+    pass
+
+
+@dataclass
+class EngineOptions:
+    keep_originals: bool = True
+    '''
+    ### Keep source files after the job is done
+    '''
+    skip_if_exists: bool = False
+    '''
+    ### Do not overwrite already existing target files
+    '''
+    fast_mode: bool = False
+    '''
+    ### Log and report progress only every 100 files
+    '''
+    compression_type: CompressionMode = CompressionTypes.LZ4
+    '''
+    ### Compression type used for packing, `AUTO_COMPRESSION` to choose per file
+    '''
+    jobs: int = 1
+    '''
+    ### Workers count for folder jobs
+    '''
+    executor: Literal['thread', 'process'] = 'thread'
+    '''
+    ### Worker pool type, lz4 releases the GIL so threads are enough in most cases
+    '''
+    incremental: bool = False
+    '''
+    ### Pack only files changed since the last run, see `PackManifest`
+    '''
+    dedup: bool = False
+    '''
+    ### Compress identical files once per run, see `CompressionCache`
+    '''
+    cache_path: Optional[Path] = None
+    '''
+    ### Folder of persistent compression cache, enables `dedup`
+    '''
+    cache_size: int = 1 << 30
+    '''
+    ### Persistent compression cache size limit (in bytes)
+    '''
+    order: Literal['scan', 'largest_first', 'smallest_first'] = 'largest_first'
+    '''
+    ### Folder job files order: as found, or sorted by size (footer size for DVPL files) within
+    a window of `ORDER_WINDOW` files, so jobs start while the tree is still scanned.
+    Largest first avoids a long single-worker tail, small files fill the gaps at the end
+    '''
+    journal: bool = False
+    '''
+    ### Record completed files of folder jobs, see `JobJournal`
+    '''
+    resume: bool = False
+    '''
+    ### Skip files completed by an interrupted run of the same job (implies `journal`)
+    '''
+    memory_limit: Optional[int] = None
+    '''
+    ### Max projected memory of in-flight file jobs (in bytes), None - no limit, see `MemoryBudget`
+    '''
+    pipeline: bool = True
+    '''
+    ### Folder jobs with thread executor overlap reading, (de)compression and writing of files
+    '''
+    trace_path: Optional[Path] = None
+    '''
+    ### Write JSONL trace with per-stage timings of every file, see `TraceWriter`
+    '''
+    bundle_path: Optional[Path] = None
+    '''
+    ### Pack folder into a single bundle file instead of a tree of DVPL files, see `BundleWriter`
+    '''
+    sync: bool = False
+    '''
+    ### Unpack only DVPL files changed or added since the last sync into the target, remove outputs
+    ### of deleted ones, see `SyncRecord`
+    '''
+
+
+@dataclass
+class EngineCallbacks:
+    log: Callable[[str, str], None] = _noop
+    '''
+    ### Called with (message, prefix)
+    '''
+    task: Callable[[str], None] = _noop
+    '''
+    ### Called with current task description
+    '''
+    progress: Callable[..., None] = _noop
+    '''
+    ### Called with (value, max), folder jobs add (done bytes, total bytes)
+    '''
+    paused: Callable[[], None] = _noop
+    resumed: Callable[[], None] = _noop
+
+
+@dataclass
+class JobResult:
+    processed: int = 0
+    skipped: int = 0
+    removed: int = 0
+    deduplicated: int = 0
+    input_bytes: int = 0
+    output_bytes: int = 0
+    elapsed: float = 0.0
+    canceled: bool = False
+    compression_stats: dict[str, int] = field(default_factory=dict)
+    '''
+    ### Packed files count per compression type
+    '''
+    stages: dict[str, StageSummary] = field(default_factory=dict)
+    '''
+    ### Time spent per stage, see `StageStats`
+    '''
+    changes: dict[str, int] = field(default_factory=dict)
+    '''
+    ### Sync mode files count per change kind (added, changed, removed, unchanged)
+    '''
+    memory_peak: int = 0
+    '''
+    ### Max projected memory of in-flight files, tracked with memory limit only (see `MemoryBudget`)
+    '''
+
+    def count_compression(self, compression_type: CompressionTypes) -> None:
+        self.compression_stats[compression_type.name] = self.compression_stats.get(compression_type.name, 0) + 1
+
+    def __str__(self):
+        compression = ', '.join(f'{k} {v}' for k, v in sorted(self.compression_stats.items())) or '-'
+        data = \
+            f'Job result:\n' \
+            f"-|  Processed: {self.processed}\n"\
+            f"-|  Skipped: {self.skipped}\n"\
+            f"-|  Removed: {self.removed}\n"\
+            f"-|  Deduplicated: {self.deduplicated}\n"\
+            f"-|  Input: {self.input_bytes} bytes\n"\
+            f"-|  Output: {self.output_bytes} bytes\n"\
+            f"-|  Elapsed: {self.elapsed:.2f} s\n"\
+            f"-|  Canceled: {self.canceled}\n"\
+            f"-|  Compression: {compression}\n"
+
+        if self.changes:
+            data += '-|  Changes: ' + ', '.join(f'{k} {v}' for k, v in self.changes.items()) + '\n'
+
+        if self.memory_peak:
+            data += f'-|  Memory peak: {self.memory_peak} bytes\n'
+
+        if self.stages:
+            data += '-|  Stages:\n'
+            for stage in sorted(self.stages, key=lambda x: STAGE_ORDER.index(x) if x in STAGE_ORDER else len(STAGE_ORDER)):
+                data += f'-|    {stage}: {self.stages[stage]}\n'
+
+        return data
+
+
+@dataclass
+class FileResult:
+    output_bytes: int
+    '''
+    ### Written bytes count
+    '''
+    footer: Optional[DVPLFooter]
+    '''
+    ### Footer of source (unpack) or target (pack) DVPL file
+    '''
+    content_hash: Optional[str] = None
+    '''
+    ### Hash of source content (pack only, on request)
+    '''
+    unchanged: bool = False
+    '''
+    ### Source content matches known hash, nothing was written
+    '''
+    cached: bool = False
+    '''
+    ### Packed file was taken from compression cache
+    '''
+    timer: Optional[StageTimer] = None
+    '''
+    ### Time spent per stage of the file job
+    '''
+    output_crc32: Optional[int] = None
+    '''
+    ### CRC32 of written data (unpack, on request)
+    '''
+
+
+@dataclass
+class WorkItem:
+    source: Path
+    target: Path
+    input_size: int
+    key: str = ''
+    '''
+    ### Source path relative to the source root, POSIX form
+    '''
+    stat: Optional[os.stat_result] = None
+    mkdir_time: float = 0.0
+    '''
+    ### Time spent creating target folder, done before the file job
+    '''
+    footprint: int = 0
+    '''
+    ### Projected memory of the file job (in bytes), set only with memory limit
+    '''
+    work_size: int = 0
+    '''
+    ### Bytes to process: source size (pack) or unpacked size from the footer (unpack)
+    '''
+
+
+def trace_record(mode: str, item: WorkItem, file_result: FileResult) -> dict[str, Any]:
+    '''
+    ### JSONL trace record of processed file
+    '''
+    timer = file_result.timer
+    footer = file_result.footer
+
+    return {
+        'mode': mode,
+        'source': str(item.source),
+        'target': str(item.target),
+        'input_bytes': item.input_size,
+        'output_bytes': file_result.output_bytes,
+        'compression': footer.compression_type.name if footer is not None else None,
+        'cached': file_result.cached,
+        'unchanged': file_result.unchanged,
+        'stages': {k: round(v, 6) for k, v in timer.stages.items()} if timer is not None else {},
+        'bytes': dict(timer.stage_bytes) if timer is not None else {},
+        'total': round(timer.total(), 6) if timer is not None else 0.0,
+    }
+
+
+def trace_summary(result: JobResult) -> dict[str, Any]:
+    '''
+    ### End-of-job trace record, see `TraceWriter.write_summary`
+    '''
+    return {
+        'processed': result.processed,
+        'skipped': result.skipped,
+        'removed': result.removed,
+        'input_bytes': result.input_bytes,
+        'output_bytes': result.output_bytes,
+        'elapsed': round(result.elapsed, 6),
+        'canceled': result.canceled,
+        'memory_peak': result.memory_peak,
+        'stages': {k: v.to_dict() for k, v in result.stages.items()},
+    }
+
+
+class UnpackJob:
+    '''
+    ### Unpack of one DVPL file, split into read, codec and write stages (see `DVPLEngine._run_pipeline`).
+    '''
+    def __init__(self, source: Path, target: Path, with_crc: bool = False, footer: Optional[DVPLFooter] = None) -> None:
+        self.source = source
+        self.target = target
+        self.with_crc = with_crc
+        self.known_footer = footer
+        '''
+        ### Footer from `FooterIndex`, used for scheduling, the file footer is still read before decoding
+        '''
+        self.timer = StageTimer()
+        self.data: Optional[DVPLFooterStruct] = None
+        self.payload: bytes | memoryview = b''
+        '''
+        ### Compressed block mapped by the read stage, released after decoding
+        '''
+        self.payload_map: Optional[ExitStack] = None
+        self.file_data: bytes | memoryview = b''
+
+    @property
+    def stored(self) -> bool:
+        '''
+        ### Payload is not compressed, it is copied kernel-side without reading
+        '''
+        return self.data is not None and self.data.footer_data.compression_type is CompressionTypes.NONE
+
+    def read_footer(self) -> None:
+        if self.data is None:
+            self.timer.skip()
+            self.data = DVPLFooterStruct.from_path(self.source)
+            self.timer.mark('footer')
+
+    def footprint(self) -> int:
+        '''
+        ### Projected memory: compressed block and decompressed data
+        '''
+        footer = self.scheduling_footer()
+
+        if footer.compression_type is CompressionTypes.NONE:
+            return COPY_CHUNK_SIZE
+
+        return footer.input_file_size + footer.compressed_block_size
+
+    def work_size(self) -> int:
+        return self.scheduling_footer().input_file_size
+
+    def scheduling_footer(self) -> DVPLFooter:
+        if self.data is None and self.known_footer is not None:
+            return self.known_footer
+
+        self.read_footer()
+        return self.data.footer_data
+
+    def read(self) -> None:
+        self.read_footer()
+
+        if self.stored:
+            return
+
+        # payload is mapped, not copied: pages are read by the codec stage when decompressing
+        self.timer.skip()
+        self.payload_map = ExitStack()
+        self.payload = self.payload_map.enter_context(self.data.map_payload())
+        self.timer.mark('read', len(self.payload))
+
+    def encode(self) -> None:
+        if self.stored:
+            return
+
+        self.timer.skip()
+        try:
+            self.file_data = decompress_block(self.payload, self.data.footer_data)
+            self.timer.mark('decompress', len(self.payload))
+        finally:
+            self.discard()
+
+    def discard(self) -> None:
+        '''
+        ### Release mapped payload, also called for a job which is not written (error or cancel)
+        '''
+        self.payload = b''
+
+        if self.payload_map is not None:
+            self.payload_map.close()
+            self.payload_map = None
+
+    def write(self) -> FileResult:
+        self.timer.skip()
+
+        if self.stored:
+            return self._copy_payload()
+
+        with open(self.target, "wb") as new_file:
+            written = new_file.write(self.file_data)
+        self.timer.mark('write', written)
+
+        output_crc32 = None
+        if self.with_crc:
+            output_crc32 = crc32(self.file_data)
+            self.timer.mark('crc32', written)
+
+        self.file_data = b''
+
+        return FileResult(written, self.data.footer_data, timer=self.timer, output_crc32=output_crc32)
+
+    def _copy_payload(self) -> FileResult:
+        size = self.data.file_size - 20
+
+        with open(self.source, "rb") as source_file, open(self.target, "wb") as new_file:
+            written = copy_range(source_file.fileno(), new_file.fileno(), size)
+
+        if written != size:
+            raise ValueError(f'File changed while copying: {self.source}')
+
+        self.timer.mark('write', written)
+
+        # stored payload is the output, its CRC32 is in the footer
+        output_crc32 = self.data.footer_data.compressed_block_crc32 if self.with_crc else None
+
+        return FileResult(written, self.data.footer_data, timer=self.timer, output_crc32=output_crc32)
+
+    def run(self) -> FileResult:
+        '''
+        ### Run all stages on the calling thread.
+
+        Payload is memory-mapped instead of read, so only the output buffer is allocated
+        and reading of the payload is counted in the `decompress` stage.
+        '''
+        # footer may be read at scheduling, time spent waiting in the pool queue is not a stage
+        self.timer.skip()
+        self.read_footer()
+
+        if self.stored:
+            return self.write()
+
+        with self.data.map_payload() as payload:
+            self.file_data = decompress_block(payload, self.data.footer_data)
+            self.timer.mark('decompress', len(payload))
+            result = self.write()
+
+        return result
+
+
+class PackJob:
+    '''
+    ### Pack of one file, split into read, codec and write stages (see `DVPLEngine._run_pipeline`).
+
+    Output depends on input bytes and `compression_type` only, so any worker produces the same file.
+    With `AUTO_COMPRESSION` the type is chosen by `choose_compression`.
+    If content hash equals `known_hash` nothing is written.
+    With `cache` identical content is compressed once and then copied.
+    With `bundle` the DVPL file is appended to the bundle instead of `target`.
+    '''
+    def __init__(
+            self,
+            source: Path,
+            target: Path,
+            compression_type: CompressionMode,
+            known_hash: Optional[str] = None,
+            with_hash: bool = False,
+            cache: Optional[CompressionCache] = None,
+            input_size: Optional[int] = None,
+            bundle: Optional[BundleWriter] = None
+        ) -> None:
+        self.source = source
+        self.input_size = input_size
+        self.target = target
+        self.compression_type = compression_type
+        self.known_hash = known_hash
+        self.with_hash = with_hash
+        self.cache = cache
+        self.bundle = bundle
+        self.timer = StageTimer()
+        self.file_data: bytes = b''
+        self.compressed_data: bytes | memoryview = b''
+        self.footer_data: Optional[DVPLFooter] = None
+        self.digest: Optional[str] = None
+        self.cache_owner = False
+        '''
+        ### Content is pending in `cache` for this job, see `CompressionCache.copy_to`
+        '''
+        self.result: Optional[FileResult] = None
+        '''
+        ### Set by codec stage if there is nothing to write (unchanged or cached content)
+        '''
+        self.stored = compression_type is CompressionTypes.NONE or (
+            isinstance(compression_type, str) and is_incompressible(source.name)
+        )
+        '''
+        ### File is stored as is, it is never read into memory but checksummed and copied
+        '''
+
+    def footprint(self) -> int:
+        '''
+        ### Projected memory: source data and compressed block (worst case)
+        '''
+        if self.stored:
+            return COPY_CHUNK_SIZE
+
+        if self.input_size is None:
+            self.input_size = self.source.stat().st_size
+
+        return self.input_size * 2 + self.input_size // 255 + 16
+
+    def work_size(self) -> int:
+        if self.input_size is None:
+            self.input_size = self.source.stat().st_size
+
+        return self.input_size
+
+    def read(self) -> None:
+        if self.stored:
+            return
+
+        self.timer.skip()
+        with open(self.source, "rb") as pack_file:
+            self.file_data = pack_file.read()
+        self.timer.mark('read', len(self.file_data))
+
+    def encode(self) -> None:
+        self.timer.skip()
+
+        if self.stored:
+            self._checksum_source()
+            return
+
+        file_data = self.file_data
+        use_cache = self.cache is not None
+
+        if self.with_hash or use_cache or self.known_hash is not None:
+            self.digest = content_hash(file_data)
+            self.timer.mark('hash', len(file_data))
+
+        if self.known_hash is not None and self.digest == self.known_hash:
+            self.result = FileResult(0, None, self.digest, unchanged=True, timer=self.timer)
+            self.file_data = b''
+            return
+
+        compression_type = self.compression_type
+        if isinstance(compression_type, str):
+            compression_type = choose_compression(self.source.name, file_data)
+            self.timer.mark('choose')
+
+        self.compression_type = compression_type
+        use_cache = use_cache and compression_type is not CompressionTypes.NONE
+
+        if use_cache and self.digest is not None:
+            # waits here while a job with the same content is compressing it
+            cached_footer = self.cache.copy_to(self.digest, compression_type, self.target)
+            self.timer.mark('cache')
+            if cached_footer is not None:
+                self.result = FileResult(
+                    cached_footer.compressed_block_size + 20, cached_footer, self.digest, cached=True, timer=self.timer
+                )
+                self.file_data = b''
+                return
+
+            self.cache_owner = True
+
+        self.compressed_data = compress_block(file_data, compression_type)
+        self.timer.mark('compress', len(file_data))
+
+        compressed_crc32 = crc32(self.compressed_data)
+        self.timer.mark('crc32', len(self.compressed_data))
+
+        self.footer_data = DVPLFooter(
+            input_file_size=len(file_data),
+            compressed_block_size=len(self.compressed_data),
+            compressed_block_crc32=compressed_crc32,
+            compression_type=compression_type,
+            footer_label='DVPL'
+        )
+        self.file_data = b''
+
+    def _checksum_source(self) -> None:
+        '''
+        ### Stream CRC32 (and content hash if needed) of stored file in chunks
+        '''
+        hasher = content_hasher() if self.with_hash or self.known_hash is not None else None
+
+        with open(self.source, "rb") as source_file:
+            checksum, size = stream_crc32(source_file, hasher)
+        self.timer.mark('crc32', size)
+
+        if hasher is not None:
+            self.digest = hasher.hexdigest()
+
+            if self.digest == self.known_hash:
+                self.result = FileResult(0, None, self.digest, unchanged=True, timer=self.timer)
+                return
+
+        self.compression_type = CompressionTypes.NONE
+        self.footer_data = DVPLFooter(
+            input_file_size=size,
+            compressed_block_size=size,
+            compressed_block_crc32=checksum,
+            compression_type=CompressionTypes.NONE,
+            footer_label='DVPL'
+        )
+
+    def write(self) -> FileResult:
+        if self.result is not None:
+            return self.result
+
+        self.timer.skip()
+        footer_data = self.footer_data
+        footer = DVPLFooterStruct.generate_footer(
+            input_file_size=footer_data.input_file_size,
+            compressed_block_size=footer_data.compressed_block_size,
+            compressed_block_crc32=footer_data.compressed_block_crc32,
+            compression_type=footer_data.compression_type.value
+        )
+
+        if self.bundle is not None:
+            if self.stored:
+                written = self.bundle.add_copy(self.target, self.source, footer_data.compressed_block_size, footer)
+            else:
+                written = self.bundle.add(self.target, self.compressed_data, footer)
+
+            self.timer.mark('write', written)
+            self.compressed_data = b''
+            return FileResult(written, footer_data, self.digest, timer=self.timer)
+
+        with open(self.target, "wb") as new_file:
+            if self.stored:
+                with open(self.source, "rb") as source_file:
+                    written = copy_range(source_file.fileno(), new_file.fileno(), footer_data.compressed_block_size)
+
+                if written != footer_data.compressed_block_size:
+                    raise ValueError(f'File changed while copying: {self.source}')
+
+                new_file.seek(0, os.SEEK_END)
+            else:
+                written = new_file.write(self.compressed_data)
+
+            written += new_file.write(footer)
+        self.timer.mark('write', written)
+        self.compressed_data = b''
+
+        if self.cache is not None and self.digest is not None and footer_data.compression_type is not CompressionTypes.NONE:
+            self.cache.add(self.digest, footer_data.compression_type, self.target, footer_data)
+            self.cache_owner = False
+            self.timer.mark('cache')
+
+        return FileResult(written, footer_data, self.digest, timer=self.timer)
+
+    def discard(self) -> None:
+        '''
+        ### Give up pending content of a job which is not written (error or cancel)
+        '''
+        self.file_data = b''
+        self.compressed_data = b''
+
+        if self.cache_owner:
+            self.cache_owner = False
+            self.cache.release(self.digest, self.compression_type)
+
+    def run(self) -> FileResult:
+        '''
+        ### Run all stages on the calling thread
+        '''
+        try:
+            self.read()
+            self.encode()
+            return self.write()
+        except BaseException:
+            self.discard()
+            raise
+
+
+class ZipUnpackJob(UnpackJob):
+    '''
+    ### Unpack of DVPL file from a zip container member, nothing is staged to disk.
+
+    `source` is the virtual path of the member (see `ZipContainer`). Payload of stored member
+    is read by offset, `NONE` payload of stored member is copied kernel-side from the container.
+    '''
+    def __init__(self, source: Path, target: Path, container: Path, info: ZipInfo, with_crc: bool = False) -> None:
+        super().__init__(source, target, with_crc)
+        self.container = container
+        self.info = info
+
+    def read_footer(self) -> None:
+        if self.data is None:
+            self.timer.skip()
+            self.data = ZipEntryStruct(self.container, self.info)
+            self.timer.mark('footer')
+
+    def scheduling_footer(self) -> DVPLFooter:
+        if self.data is None and self.info.compress_type != ZIP_STORED:
+            # footer only, the member is not kept in memory while the job waits and is inflated again when read
+            self.timer.skip()
+            self.data = ZipEntryStruct(self.container, self.info, keep=False)
+            self.timer.mark('footer')
+
+        return super().scheduling_footer()
+
+    def footprint(self) -> int:
+        '''
+        ### Projected memory, deflated member is also kept inflated until decoded.
+
+        Footer of deflated member is not read for this: the member size is counted
+        for the inflated member and once more for the unpacked data.
+        '''
+        if self.data is None and self.info.compress_type != ZIP_STORED:
+            return self.info.file_size * 2
+
+        footprint = super().footprint()
+
+        if self.data.zip_stored:
+            return footprint
+
+        if self.stored:
+            return self.info.file_size
+
+        return footprint + self.info.file_size - self.data.footer_data.compressed_block_size
+
+    def work_size(self) -> int:
+        if self.data is None and self.info.compress_type != ZIP_STORED:
+            # footer of deflated member needs inflating, member size is close enough for ordering
+            return self.info.file_size
+
+        return super().work_size()
+
+    def read(self) -> None:
+        self.read_footer()
+
+        if self.stored and self.data.zip_stored:
+            return
+
+        self.timer.skip()
+        self.payload_map = ExitStack()
+        self.payload = self.payload_map.enter_context(self.data.map_payload())
+        self.timer.mark('read', self.info.compress_size)
+
+    def _copy_payload(self) -> FileResult:
+        if not self.data.zip_stored:
+            try:
+                with open(self.target, "wb") as new_file:
+                    written = new_file.write(self.payload)
+            finally:
+                self.discard()
+            self.timer.mark('write', written)
+
+            output_crc32 = self.data.footer_data.compressed_block_crc32 if self.with_crc else None
+            return FileResult(written, self.data.footer_data, timer=self.timer, output_crc32=output_crc32)
+
+        size = self.data.file_size - 20
+
+        with open(self.container, "rb") as source_file, open(self.target, "wb") as new_file:
+            written = copy_range(source_file.fileno(), new_file.fileno(), size, self.data.data_offset)
+
+        if written != size:
+            raise ValueError(f'Container changed while copying: {self.container}')
+
+        self.timer.mark('write', written)
+
+        output_crc32 = self.data.footer_data.compressed_block_crc32 if self.with_crc else None
+        return FileResult(written, self.data.footer_data, timer=self.timer, output_crc32=output_crc32)
+
+    def run(self) -> FileResult:
+        try:
+            self.read()
+            self.encode()
+            return self.write()
+        except BaseException:
+            self.discard()
+            raise
+
+
+FileJob = Union[UnpackJob, PackJob]
+
+
+def unpack_file(source: Path, target: Path) -> FileResult:
+    '''
+    ### Decompress DVPL file `source` into `target`, see `UnpackJob`
+    '''
+    return UnpackJob(source, target).run()
+
+
+def pack_file(
+        source: Path,
+        target: Path,
+        compression_type: CompressionMode,
+        known_hash: Optional[str] = None,
+        with_hash: bool = False,
+        cache: Optional[CompressionCache] = None
+    ) -> FileResult:
+    '''
+    ### Compress `source` into DVPL file `target`, see `PackJob`
+    '''
+    return PackJob(source, target, compression_type, known_hash, with_hash, cache).run()
+
+
+def run_job(job: FileJob) -> FileResult:
+    '''
+    ### Pool entry point, module level so it can be pickled for process workers.
+    '''
+    return job.run()
+
+
+def unpack_target(source: Path) -> str:
+    '''
+    ### Name of unpacked file for DVPL file `source`
+    '''
+    return source.name.removesuffix(source.suffix)
+
+
+def pack_target(source: Path) -> str:
+    '''
+    ### Name of DVPL file for file `source`
+    '''
+    return source.name + '.dvpl'
+
+
+class DVPLEngine:
+    '''
+    ### UI-free pack / unpack engine.
+
+    All user feedback goes through `EngineCallbacks`, options are plain values,
+    so the engine can run from the Tk app, CLI or any other script.
+    '''
+    def __init__(self, options: Optional[EngineOptions] = None, callbacks: Optional[EngineCallbacks] = None) -> None:
+        self.options = options if options is not None else EngineOptions()
+        self.callbacks = callbacks if callbacks is not None else EngineCallbacks()
+
+        self.PAUSE_FLAG = False
+        self.CANCEL_FLAG = False
+
+    def set_pause(self) -> None:
+        self.PAUSE_FLAG = True
+
+    def set_cancel(self) -> None:
+        self.CANCEL_FLAG = True
+
+    def reset_pause(self) -> None:
+        self.PAUSE_FLAG = False
+
+    def _reset_flags(self) -> None:
+        self.PAUSE_FLAG = False
+        self.CANCEL_FLAG = False
+
+    def _wait_if_paused(self) -> None:
+        if not self.PAUSE_FLAG:
+            return
+
+        self.callbacks.paused()
+        while self.PAUSE_FLAG and not self.CANCEL_FLAG:
+            time.sleep(0.1)
+        self.callbacks.resumed()
+
+    def unpack_folder(self, folder: FolderSource, target_path: Path) -> JobResult:
+        return self._process_folder(folder, target_path, 'unpack')
+
+    def pack_folder(self, folder: FolderSource, target_path: Path) -> JobResult:
+        return self._process_folder(folder, target_path, 'pack')
+
+    def _process_folder(self, folder: FolderSource, target_path: Path, mode: str) -> JobResult:
+        self._reset_flags()
+        result = JobResult()
+        start_time = time.perf_counter()
+        prefix = "[extract]: " if mode == 'unpack' else "[compress]: "
+        verb = 'Extracting' if mode == 'unpack' else 'Packing'
+        fast_mode = self.options.fast_mode
+        files = folder.dvpl_files() if mode == 'unpack' else folder.files()
+        meta = folder.folder_meta
+        jobs = max(1, self.options.jobs)
+        done = 0
+        done_bytes = 0
+        total_bytes = 0
+        clean_up_files: list[Path] = []
+        manifest: Optional[PackManifest] = None
+        sync: Optional[SyncRecord] = None
+        seen_keys: set[str] = set()
+        requested_compression = compression_name(self.options.compression_type)
+        cache = self._make_cache() if mode == 'pack' else None
+        stats = StageStats()
+        trace = TraceWriter(self.options.trace_path)
+        budget = MemoryBudget(self.options.memory_limit)
+        journal: Optional[JobJournal] = None
+        bundle: Optional[BundleWriter] = None
+        container = folder if isinstance(folder, ZipContainer) else None
+        finished = False
+
+        if container is not None and (mode != 'unpack' or not self.options.keep_originals):
+            raise ValueError("Containers can be unpacked only, keeping the container")
+
+        if mode == 'pack' and self.options.bundle_path is not None:
+            if self.options.executor != 'thread':
+                raise ValueError("Bundle output requires thread executor")
+
+            if self.options.incremental or self.options.journal or self.options.resume or self.options.skip_if_exists:
+                raise ValueError("Bundle output does not support incremental, journal, resume and skip if exists modes")
+
+            if self.options.dedup or self.options.cache_path is not None:
+                raise ValueError("Bundle output does not support dedup and compression cache")
+
+            if self.options.bundle_path.absolute().is_relative_to(folder.path.absolute()):
+                raise ValueError("Bundle file must be outside of the source folder")
+
+        if mode == 'pack' and self.options.incremental:
+            if not self.options.keep_originals:
+                raise ValueError("Incremental packing requires keeping original files")
+
+            manifest = PackManifest.load(target_path, folder.path)
+            self.callbacks.log(f'Incremental mode, {len(manifest.entries)} files in manifest', prefix)
+
+        if self.options.sync:
+            if mode != 'unpack':
+                raise ValueError("Sync mode is supported for unpacking only")
+
+            sync = SyncRecord.load(target_path)
+            result.changes = {'added': 0, 'changed': 0, 'removed': 0, 'unchanged': 0}
+            self.callbacks.log(f'Sync mode, {len(sync.entries)} files in sync record', prefix)
+
+        if self.options.journal or self.options.resume:
+            journal = JobJournal(target_path, folder.path, mode, self._journal_settings(mode))
+
+            if self.options.resume:
+                if not journal.load():
+                    self.callbacks.log('Journal of other job or settings ignored, starting over', prefix)
+
+                self.callbacks.log(f'Resume mode, {len(journal.entries)} files in journal', prefix)
+
+            journal.open(self.options.resume)
+
+        if mode == 'pack' and self.options.bundle_path is not None:
+            bundle = BundleWriter(self.options.bundle_path, target_path)
+            self.callbacks.log(f'Bundle output: {self.options.bundle_path}', prefix)
+
+        def total() -> int:
+            return meta.dvpl_count if mode == 'unpack' else meta.files_count
+
+        def progress() -> None:
+            self.callbacks.progress(done, total(), done_bytes, total_bytes)
+
+        def skip(message: str, size: int) -> None:
+            nonlocal done, done_bytes
+            result.skipped += 1
+            done += 1
+            done_bytes += size
+            if not fast_mode:
+                self.callbacks.log(message, prefix)
+                progress()
+
+        def tasks() -> Iterator[tuple[FileJob, WorkItem]]:
+            nonlocal total_bytes
+
+            for file in files:
+                if not self.options.keep_originals:
+                    clean_up_files.append(file)
+
+                target_dir = target_path.joinpath(file.parent.relative_to(folder.path))
+                target = target_dir.joinpath(unpack_target(file) if mode == 'unpack' else pack_target(file))
+                stat = container.stat(file) if container is not None else file.stat()
+                item = WorkItem(source=file, target=target, input_size=stat.st_size)
+                known_hash = None
+
+                if manifest is not None or journal is not None or sync is not None:
+                    item.key = file.relative_to(folder.path).as_posix()
+                    item.stat = stat
+
+                if journal is not None and journal.check(item.key, stat, target):
+                    seen_keys.add(item.key)
+                    total_bytes += item.input_size
+                    skip(f'Already done (journal): {file}', item.input_size)
+                    continue
+
+                if manifest is not None:
+                    seen_keys.add(item.key)
+                    state = manifest.check(item.key, stat, requested_compression, target)
+
+                    if state:
+                        total_bytes += item.input_size
+                        skip(f'File not changed: {file}', item.input_size)
+                        continue
+
+                    if state is None:
+                        known_hash = manifest.entries[item.key].content_hash
+
+                elif sync is None and self.options.skip_if_exists and target.exists():
+                    total_bytes += item.input_size
+                    skip(f'File already exists: {target}', item.input_size)
+                    continue
+
+                if mode == 'unpack' and item.input_size < 20:
+                    total_bytes += item.input_size
+                    skip(f'File too small, skipping: {file}', item.input_size)
+                    continue
+
+                if container is not None:
+                    job = ZipUnpackJob(file, target, container.path, container.members[file], with_crc=journal is not None)
+                elif mode == 'unpack':
+                    known_footer = folder.footer(file, stat) if isinstance(folder, FooterIndex) else None
+                    job = UnpackJob(file, target, with_crc=journal is not None, footer=known_footer)
+                else:
+                    job = PackJob(
+                        file, target, self.options.compression_type, known_hash, manifest is not None, cache, item.input_size,
+                        bundle
+                    )
+
+                if sync is not None:
+                    seen_keys.add(item.key)
+
+                    try:
+                        unchanged = sync.check(item.key, job.scheduling_footer(), target)
+                    except (OSError, ValueError):
+                        # broken file is unpacked to report the error
+                        unchanged = False
+
+                    if unchanged:
+                        result.changes['unchanged'] += 1
+                        total_bytes += item.input_size
+                        skip(f'File not changed: {file}', item.input_size)
+                        continue
+
+                if bundle is None:
+                    mkdir_start = time.perf_counter()
+                    target_dir.mkdir(parents=True, exist_ok=True)
+                    item.mkdir_time = time.perf_counter() - mkdir_start
+
+                if budget.limit is not None:
+                    item.footprint = job.footprint()
+
+                item.work_size = job.work_size()
+                total_bytes += item.work_size
+
+                yield job, item
+
+        def ordered_tasks() -> Iterator[tuple[FileJob, WorkItem]]:
+            if self.options.order == 'scan':
+                return tasks()
+
+            return window_ordered(tasks())
+
+        def window_ordered(source: Iterator[tuple[FileJob, WorkItem]]) -> Iterator[tuple[FileJob, WorkItem]]:
+            sign = -1 if self.options.order == 'largest_first' else 1
+            heap: list[tuple[int, int, tuple[FileJob, WorkItem]]] = []
+
+            for index, task in enumerate(source):
+                heapq.heappush(heap, (sign * task[1].work_size, index, task))
+
+                if len(heap) > ORDER_WINDOW:
+                    yield heapq.heappop(heap)[2]
+
+            while heap:
+                yield heapq.heappop(heap)[2]
+
+        def footprint(item: WorkItem) -> int:
+            return item.footprint
+
+        def on_done(item: WorkItem, file_result: FileResult) -> None:
+            nonlocal done, done_bytes
+
+            if file_result.timer is not None:
+                file_result.timer.stages['mkdir'] = item.mkdir_time
+                stats.add(file_result.timer)
+                trace.write(trace_record(mode, item, file_result))
+
+            if file_result.unchanged and manifest is not None and item.stat is not None:
+                manifest.touch(item.key, item.stat)
+                skip(f'File not changed: {item.source}', item.work_size)
+                return
+
+            if manifest is not None and item.stat is not None and file_result.content_hash is not None:
+                manifest.update(item.key, item.stat, file_result.content_hash, file_result.footer, requested_compression)
+
+            if journal is not None and item.stat is not None:
+                if mode == 'unpack':
+                    output_crc32 = file_result.output_crc32
+                else:
+                    output_crc32 = file_result.footer.compressed_block_crc32
+
+                journal.add(item.key, item.stat, item.target, file_result.output_bytes, output_crc32)
+
+            if sync is not None and item.stat is not None:
+                result.changes['changed' if item.key in sync.entries else 'added'] += 1
+                sync.update(item.key, file_result.footer, item.target)
+
+            result.output_bytes += file_result.output_bytes
+            result.input_bytes += item.input_size
+            result.processed += 1
+            result.deduplicated += file_result.cached
+            done += 1
+            done_bytes += item.work_size
+
+            details = ''
+            if mode == 'pack' and file_result.footer is not None:
+                result.count_compression(file_result.footer.compression_type)
+                details = f' ({file_result.footer.compression_type.name})'
+
+            if not fast_mode:
+                self.callbacks.log(f'file {item.source} {mode}ed{details}, new file - {item.target}', prefix)
+                progress()
+
+            elif done % 100 == 0:
+                self.callbacks.log(f'{mode.capitalize()}ed {done} files', prefix)
+                self.callbacks.task(f'{verb} files... {done}')
+                progress()
+
+        details = f', compression: {compression_name(self.options.compression_type)}' if mode == 'pack' else ''
+        self.callbacks.log(f'{verb} folder {folder.path} ({jobs} jobs{details}, order: {self.options.order})...', prefix)
+        self.callbacks.task(f'{verb} files...')
+        progress()
+
+        try:
+            with trace:
+                if self.options.pipeline and self.options.executor == 'thread':
+                    result.canceled = not self._run_pipeline(ordered_tasks(), jobs, on_done, budget, footprint)
+                else:
+                    pool_tasks = ((run_job, (job, ), item) for job, item in ordered_tasks())
+                    result.canceled = not self._run_pool(pool_tasks, jobs, on_done, budget, footprint)
+
+            finished = not result.canceled
+        finally:
+            if cache is not None:
+                cache.release_pending()
+
+            if journal is not None:
+                journal.close(finished)
+
+            if bundle is not None:
+                bundle.close(finished)
+
+            if manifest is not None:
+                manifest_start = time.perf_counter()
+                manifest.save()
+                stats.add_stage('manifest', time.perf_counter() - manifest_start)
+
+            if sync is not None:
+                sync.save()
+
+        stats.add_stage('scan', folder.scan_time)
+
+        result.memory_peak = budget.peak
+
+        if result.canceled:
+            result.elapsed = time.perf_counter() - start_time
+            result.stages = stats.summary()
+            trace.write_summary(trace_summary(result))
+            self.callbacks.log('Task canceled', prefix)
+            return result
+
+        if manifest is not None:
+            result.removed = self._remove_deleted(manifest, seen_keys, target_path, mode)
+            manifest.save()
+
+        if sync is not None:
+            result.removed = self._remove_deleted(sync, seen_keys, target_path, mode)
+            result.changes['removed'] = result.removed
+            sync.save()
+            self.callbacks.log(
+                'Sync: ' + ', '.join(f'{k} {v}' for k, v in result.changes.items()), prefix
+            )
+
+        if mode == 'pack' and isinstance(self.options.compression_type, str) and result.compression_stats:
+            self.callbacks.log(
+                f'{compression_name(self.options.compression_type)} chose: '
+                + ', '.join(f'{k} {v}' for k, v in sorted(result.compression_stats.items())), prefix
+            )
+
+        self.callbacks.task('')
+        self.callbacks.progress(1, 1)
+
+        clean_up_start = time.perf_counter()
+        self.clean_up(clean_up_files)
+        stats.add_stage('clean_up', time.perf_counter() - clean_up_start)
+
+        result.elapsed = time.perf_counter() - start_time
+        result.stages = stats.summary()
+        trace.write_summary(trace_summary(result))
+        self.callbacks.log('Folder extracted / packed, all done!', prefix)
+
+        return result
+
+    def _remove_deleted(
+        self, record: Union[PackManifest, SyncRecord], seen_keys: set[str], target_path: Path, mode: str
+    ) -> int:
+        '''
+        ### Remove outputs of sources which are no longer in the source tree
+        '''
+        removed = 0
+        prefix = "[extract]: " if mode == 'unpack' else "[compress]: "
+
+        for key in [x for x in record.entries if x not in seen_keys]:
+            source = target_path.joinpath(key)
+            target = source.with_name(unpack_target(source) if mode == 'unpack' else pack_target(source))
+            try:
+                target.unlink(missing_ok=True)
+            except OSError as e:
+                self.callbacks.log(f'Can\'t remove {target}: {e}', "[stderr]: ")
+                continue
+
+            del record.entries[key]
+            removed += 1
+            self.callbacks.log(f'Source removed, output deleted: {target}', prefix)
+
+        return removed
+
+    def verify_folder(self, folder: FolderSource, decompress: bool = False) -> VerifyReport:
+        '''
+        ### Check every DVPL file of `folder`, nothing is written
+        '''
+        if isinstance(folder, ZipContainer):
+            raise ValueError("Containers can not be verified, unpack them first")
+
+        self._reset_flags()
+        report = VerifyReport(path=str(folder.path))
+        start_time = time.perf_counter()
+        prefix = "[verify]: "
+        meta = folder.folder_meta
+        jobs = max(1, self.options.jobs)
+
+        def on_done(file: Path, verify_result: VerifyResult) -> None:
+            report.add(verify_result)
+
+            if not verify_result.ok:
+                self.callbacks.log(f'{file}: {", ".join(verify_result.errors)}', prefix)
+
+            if not self.options.fast_mode or report.checked % 100 == 0:
+                self.callbacks.progress(report.checked, meta.dvpl_count)
+
+        self.callbacks.log(f'Verifying folder {folder.path} ({jobs} jobs)...', prefix)
+        self.callbacks.task('Verifying files...')
+        self.callbacks.progress(0, meta.dvpl_count)
+
+        tasks = ((verify_file, (file, decompress), file) for file in folder.dvpl_files())
+        report.canceled = not self._run_pool(tasks, jobs, on_done)
+        report.elapsed = time.perf_counter() - start_time
+
+        self.callbacks.task('')
+        self.callbacks.progress(1, 1)
+        self.callbacks.log(f'Checked {report.checked} files, {len(report.bad_files)} bad', prefix)
+
+        return report
+
+    def _run_pool(
+            self,
+            tasks: Iterable[tuple[Callable[..., Any], tuple, Any]],
+            jobs: int,
+            on_done: Callable[[Any, Any], None],
+            budget: Optional[MemoryBudget] = None,
+            footprint: Callable[[Any], int] = lambda context: 0
+        ) -> bool:
+        '''
+        ### Run `func(*args)` for every `(func, args, context)` task, on the worker pool if `jobs` > 1.
+
+        `on_done(context, result)` is always called on the calling thread.
+        At most `jobs * 2` tasks are in flight, so pause and cancel stay responsive.
+        With `budget` a task is submitted only when `footprint(context)` fits.
+        Returns False if the job was canceled.
+        '''
+        executor = self._make_executor(jobs) if jobs > 1 else None
+        budget = budget if budget is not None else MemoryBudget()
+        pending: dict[Future, Any] = {}
+
+        def collect(return_when: str) -> None:
+            completed, _ = wait(pending, return_when=return_when)
+            for future in completed:
+                context = pending.pop(future)
+                budget.release(footprint(context))
+                on_done(context, future.result())
+
+        try:
+            for func, args, context in tasks:
+                if self.CANCEL_FLAG:
+                    break
+
+                self._wait_if_paused()
+
+                if executor is None:
+                    on_done(context, func(*args))
+                    continue
+
+                size = footprint(context)
+                while not budget.try_acquire(size):
+                    collect(FIRST_COMPLETED)
+
+                pending[executor.submit(func, *args)] = context
+                if len(pending) >= jobs * 2:
+                    collect(FIRST_COMPLETED)
+
+            if pending:
+                collect(ALL_COMPLETED)
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True, cancel_futures=True)
+
+        return not self.CANCEL_FLAG
+
+    def _run_pipeline(
+            self,
+            tasks: Iterable[tuple[FileJob, Any]],
+            jobs: int,
+            on_done: Callable[[Any, FileResult], None],
+            budget: Optional[MemoryBudget] = None,
+            footprint: Callable[[Any], int] = lambda context: 0
+        ) -> bool:
+        '''
+        ### Run file jobs as a pipeline: read (calling thread) -> codec (`jobs` threads) -> write (one thread).
+
+        Reading of the next file overlaps (de)compression and writing of previous ones.
+        At most `jobs * 2 + 2` jobs are in flight, with `budget` a job is read only
+        when `footprint(context)` fits, so memory stays bounded.
+        `on_done(context, result)` is always called on the calling thread.
+        Returns False if the job was canceled.
+        '''
+        limit = jobs * 2 + 2
+        budget = budget if budget is not None else MemoryBudget()
+        codec_pool = ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="ExtractorCodec")
+        write_queue: Queue[Optional[tuple[FileJob, Any, Future]]] = Queue()
+        done_queue: Queue[tuple[Any, Optional[FileResult], Optional[BaseException]]] = Queue()
+        in_flight = 0
+
+        def writer() -> None:
+            while True:
+                entry = write_queue.get()
+                if entry is None:
+                    return
+
+                job, context, future = entry
+                try:
+                    future.result()
+                    done_queue.put((context, job.write(), None))
+                except BaseException as e:
+                    job.discard()
+                    done_queue.put((context, None, e))
+                finally:
+                    budget.release(footprint(context))
+
+        def collect(block: bool) -> None:
+            nonlocal in_flight
+
+            while in_flight:
+                try:
+                    context, file_result, error = done_queue.get(block=block)
+                except Empty:
+                    return
+
+                in_flight -= 1
+                block = False
+
+                if error is not None:
+                    raise error
+
+                on_done(context, file_result)
+
+        writer_thread = Thread(target=writer, daemon=True, name="ExtractorWriter")
+        writer_thread.start()
+
+        try:
+            for job, context in tasks:
+                if self.CANCEL_FLAG:
+                    break
+
+                self._wait_if_paused()
+                collect(block=in_flight >= limit)
+
+                size = footprint(context)
+                if not budget.acquire(size, lambda: self.CANCEL_FLAG):
+                    break
+
+                try:
+                    job.read()
+                except BaseException:
+                    job.discard()
+                    budget.release(size)
+                    raise
+
+                in_flight += 1
+                codec_pool.submit(job.encode).add_done_callback(
+                    lambda future, job=job, context=context: write_queue.put((job, context, future))
+                )
+
+            while in_flight:
+                collect(block=True)
+        finally:
+            codec_pool.shutdown(wait=True, cancel_futures=True)
+            write_queue.put(None)
+            writer_thread.join()
+
+        return not self.CANCEL_FLAG
+
+    def _journal_settings(self, mode: str) -> dict:
+        '''
+        ### Options which affect outputs, a journal written with other values is not resumed.
+
+        Logging options and `keep_originals` (sources are removed after the job finishes) do not count.
+        '''
+        if mode == 'unpack':
+            return {}
+
+        return {
+            'compression': compression_name(self.options.compression_type),
+            'dedup': self.options.dedup,
+            'cache': str(self.options.cache_path) if self.options.cache_path is not None else None,
+        }
+
+    def _make_cache(self) -> Optional[CompressionCache]:
+        if self.options.cache_path is not None:
+            return CompressionCache(self.options.cache_path, self.options.cache_size)
+
+        if self.options.dedup:
+            return CompressionCache()
+
+        return None
+
+    def _make_executor(self, jobs: int) -> Executor:
+        if self.options.executor == 'process':
+            return ProcessPoolExecutor(max_workers=jobs)
+
+        return ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="ExtractorWorker")
+
+    def unpack_file(self, path: Path, target_path: Path) -> JobResult:
+        return self._process_file(path, target_path.joinpath(unpack_target(path)), 'unpack')
+
+    def pack_file(self, path: Path, target_path: Path) -> JobResult:
+        return self._process_file(path, target_path.joinpath(pack_target(path)), 'pack')
+
+    def _process_file(self, path: Path, target: Path, mode: str) -> JobResult:
+        self._reset_flags()
+        result = JobResult()
+        start_time = time.perf_counter()
+        prefix = "[unpacker]: " if mode == 'unpack' else "[packer]: "
+
+        self.callbacks.progress(0, 1)
+
+        if self.options.skip_if_exists and target.exists():
+            self.callbacks.log(f'File already exists: {target}', prefix)
+            self.callbacks.task('')
+            self.callbacks.progress(1, 1)
+            result.skipped += 1
+            return result
+
+        self.callbacks.task(f'{mode.capitalize()}ing file...')
+        self.callbacks.log(f'{mode.capitalize()}ing file in target path: {target.parent}', prefix)
+        target.parent.mkdir(parents=True, exist_ok=True)
+
+        cache = self._make_cache() if mode == 'pack' else None
+        if mode == 'unpack':
+            file_result = UnpackJob(path, target).run()
+        else:
+            file_result = PackJob(path, target, self.options.compression_type, cache=cache).run()
+        stats = StageStats()
+        item = WorkItem(source=path, target=target, input_size=path.stat().st_size)
+
+        if file_result.timer is not None:
+            stats.add(file_result.timer)
+            with TraceWriter(self.options.trace_path) as trace:
+                trace.write(trace_record(mode, item, file_result))
+
+        result.output_bytes = file_result.output_bytes
+        result.deduplicated = int(file_result.cached)
+
+        if mode == 'pack' and file_result.footer is not None:
+            result.count_compression(file_result.footer.compression_type)
+
+        result.input_bytes = item.input_size
+        result.processed = 1
+
+        self.callbacks.log('Clean up...', prefix)
+        self.callbacks.task('Clean up...')
+        clean_up_start = time.perf_counter()
+        self.clean_up([path])
+        stats.add_stage('clean_up', time.perf_counter() - clean_up_start)
+
+        result.elapsed = time.perf_counter() - start_time
+        result.stages = stats.summary()
+        TraceWriter(self.options.trace_path).write_summary(trace_summary(result))
+        self.callbacks.task('')
+        self.callbacks.progress(1, 1)
+        self.callbacks.log(f'{mode.capitalize()}ed file: {target}', prefix)
+
+        return result
+
+    def clean_up(self, files: list[Path]) -> None:
+        if self.options.keep_originals:
+            return
+
+        self.callbacks.log('Clean up...', "[extract]: ")
+        for file in files:
+            try:
+                file.unlink()
+            except OSError as e:
+                self.callbacks.log(f'Can\'t remove {file}: {e}', "[stderr]: ")
+
+        self.callbacks.log('Clean up completed', "[extract]: ")
@@ -34,7 +34,7 @@ def wrap_exceptions(frame_pos: int, ignore_exceptions: tuple) -> Callable[..., C
                             return
                         
                         frame.log_frame.add_log(traceback.format_exc(), prefix="[stderr]: ")
-                        frame.set_state_on_error(e)
+                        frame.events.post(frame.set_state_on_error, e)
                     else:
                         if e in ignore_exceptions:
                             return
@@ -0,0 +1,347 @@
+import json
+import os
+import time
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Optional
+
+from lib.data_classes import FolderMeta
+from lib.dvp_struct import SERVICE_FILE_PREFIX, CompressionTypes, DVPLFooter, read_footer
+
+INDEX_NAME = '.dvpl_index.json'
+INDEX_VERSION = 1
+
+
+@dataclass
+class IndexEntry:
+    size: int
+    mtime_ns: int
+    footer: Optional[DVPLFooter] = None
+    '''
+    ### Parsed footer, DVPL files only
+    '''
+    error: Optional[str] = None
+    '''
+    ### Footer read error, DVPL files only
+    '''
+
+    def to_dict(self) -> dict[str, Any]:
+        data: dict[str, Any] = {'size': self.size, 'mtime_ns': self.mtime_ns}
+
+        if self.footer is not None:
+            data['footer'] = [
+                self.footer.input_file_size,
+                self.footer.compressed_block_size,
+                self.footer.compressed_block_crc32,
+                self.footer.compression_type.name,
+                self.footer.footer_label,
+            ]
+
+        if self.error is not None:
+            data['error'] = self.error
+
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> 'IndexEntry':
+        footer = None
+
+        if 'footer' in data:
+            input_file_size, compressed_block_size, compressed_block_crc32, compression_type, footer_label = data['footer']
+            footer = DVPLFooter(
+                input_file_size=input_file_size,
+                compressed_block_size=compressed_block_size,
+                compressed_block_crc32=compressed_block_crc32,
+                compression_type=CompressionTypes[compression_type],
+                footer_label=footer_label
+            )
+
+        return cls(data['size'], data['mtime_ns'], footer, data.get('error'))
+
+
+@dataclass
+class DirRecord:
+    mtime_ns: int
+    dirs: list[str] = field(default_factory=list)
+    files: dict[str, IndexEntry] = field(default_factory=dict)
+
+
+@dataclass
+class IndexSummary:
+    dvpl_count: int = 0
+    bad_count: int = 0
+    files_size: int = 0
+    '''
+    ### Total size of not DVPL files
+    '''
+    packed_size: int = 0
+    unpacked_size: int = 0
+    compression_stats: dict[str, int] = field(default_factory=dict)
+
+    def __str__(self):
+        compression = ', '.join(f'{k} {v}' for k, v in sorted(self.compression_stats.items())) or '-'
+        data = \
+            f'DVPL Index Info:\n' \
+            f"-|  Packed size: {self.packed_size} bytes\n"\
+            f"-|  Unpacked size: {self.unpacked_size} bytes\n"\
+            f"-|  Other files size: {self.files_size} bytes\n"\
+            f"-|  Bad DVPL files: {self.bad_count}\n"\
+            f"-|  Compression: {compression}\n"
+
+        return data
+
+
+class FooterIndex:
+    '''
+    ### Sidecar index of a folder tree, stored as `INDEX_NAME` in the tree root.
+
+    Keeps size, mtime and parsed DVPL footer of every file, so the tree can be listed
+    and summarized without opening DVPL files. `refresh` rescans only folders whose mtime changed
+    (files added, removed or renamed), footers are re-read only for changed files.
+    Can be used as a folder job source like `Folder`.
+    '''
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.index_path = path.joinpath(INDEX_NAME)
+        self.dirs: dict[str, DirRecord] = {}
+        self.folder_meta = FolderMeta(self.path, 0, 0, 0)
+        self.scan_time = 0.0
+        self.rescanned = 0
+        '''
+        ### Folders rescanned by the last `refresh`
+        '''
+
+    @classmethod
+    def open(cls, path: Path, check_files: bool = False) -> 'FooterIndex':
+        '''
+        ### Load, refresh and save the index of `path`, read-only trees are indexed in memory only
+        '''
+        index = cls.load(path)
+        index.refresh(check_files)
+
+        try:
+            index.save()
+        except OSError:
+            pass
+
+        return index
+
+    @classmethod
+    def open_saved(cls, path: Path) -> Optional['FooterIndex']:
+        '''
+        ### Load and refresh a saved index of `path` without writing it, None if there is no usable index
+        '''
+        index = cls.load(path)
+
+        if not index.dirs:
+            return None
+
+        index.refresh()
+        return index
+
+    @classmethod
+    def load(cls, path: Path) -> 'FooterIndex':
+        '''
+        ### Load saved index, unreadable or foreign index gives an empty one
+        '''
+        index = cls(path)
+
+        try:
+            data = json.loads(index.index_path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return index
+
+        if data.get('version') != INDEX_VERSION or data.get('root') != str(path.absolute()):
+            return index
+
+        try:
+            index.dirs = {
+                key: DirRecord(
+                    mtime_ns=value['mtime_ns'],
+                    dirs=value['dirs'],
+                    files={k: IndexEntry.from_dict(v) for k, v in value['files'].items()}
+                )
+                for key, value in data['dirs'].items()
+            }
+        except (KeyError, TypeError, ValueError):
+            index.dirs = {}
+
+        index._update_meta()
+        return index
+
+    def save(self) -> None:
+        '''
+        ### Write index atomically.
+
+        Writing the index changes the root folder mtime, the new mtime is kept if the root
+        was not changed otherwise, so the next `refresh` does not rescan the root.
+        '''
+        root = self.dirs.get('')
+        try:
+            root_unchanged = root is not None and os.stat(self.path).st_mtime_ns == root.mtime_ns
+        except OSError:
+            root_unchanged = False
+
+        data = {
+            'version': INDEX_VERSION,
+            'root': str(self.path.absolute()),
+            'dirs': {
+                key: {
+                    'mtime_ns': record.mtime_ns,
+                    'dirs': record.dirs,
+                    'files': {k: v.to_dict() for k, v in record.files.items()},
+                }
+                for key, record in self.dirs.items()
+            },
+        }
+        temp_path = self.index_path.with_name(self.index_path.name + '.tmp')
+        temp_path.write_text(json.dumps(data, separators=(',', ':')), encoding='utf-8')
+        os.replace(temp_path, self.index_path)
+
+        if root_unchanged:
+            root.mtime_ns = os.stat(self.path).st_mtime_ns
+            data['dirs']['']['mtime_ns'] = root.mtime_ns
+
+            # rewritten in place, which does not change the folder mtime again (a damaged index is rebuilt)
+            with open(self.index_path, 'r+', encoding='utf-8') as file:
+                file.write(json.dumps(data, separators=(',', ':')))
+                file.truncate()
+
+    def refresh(self, check_files: bool = False) -> int:
+        '''
+        ### Bring the index up to date, returns rescanned folders count.
+
+        Folders with unchanged mtime are reused as is. In-place file overwrites do not change
+        folder mtime, `check_files` also compares size and mtime of every file of such folders.
+        '''
+        start_time = time.perf_counter()
+        old_dirs = self.dirs
+        self.dirs = {}
+        self.rescanned = 0
+        stack = ['']
+
+        while stack:
+            key = stack.pop()
+            folder = self.path.joinpath(key) if key else self.path
+
+            try:
+                mtime_ns = os.stat(folder).st_mtime_ns
+                old = old_dirs.get(key)
+
+                if old is not None and old.mtime_ns == mtime_ns:
+                    record = self._check_files(folder, old) if check_files else old
+                else:
+                    record = self._scan_dir(folder, mtime_ns, old)
+                    self.rescanned += 1
+            except (PermissionError, FileNotFoundError, NotADirectoryError):
+                continue
+
+            self.dirs[key] = record
+            stack.extend(f'{key}/{name}' if key else name for name in record.dirs)
+
+        self._update_meta()
+        self.scan_time = time.perf_counter() - start_time
+
+        return self.rescanned
+
+    def _scan_dir(self, folder: Path, mtime_ns: int, old: Optional[DirRecord]) -> DirRecord:
+        record = DirRecord(mtime_ns)
+
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    record.dirs.append(entry.name)
+                    continue
+
+                if not entry.is_file() or entry.name.startswith(SERVICE_FILE_PREFIX):
+                    continue
+
+                stat = entry.stat()
+                old_entry = old.files.get(entry.name) if old is not None else None
+                record.files[entry.name] = self._make_entry(Path(entry.path), stat, old_entry)
+
+        return record
+
+    def _check_files(self, folder: Path, old: DirRecord) -> DirRecord:
+        record = DirRecord(old.mtime_ns, old.dirs)
+
+        for name, old_entry in old.files.items():
+            try:
+                stat = os.stat(folder.joinpath(name))
+            except OSError:
+                continue
+
+            record.files[name] = self._make_entry(folder.joinpath(name), stat, old_entry)
+
+        return record
+
+    @staticmethod
+    def _make_entry(path: Path, stat: os.stat_result, old: Optional[IndexEntry]) -> IndexEntry:
+        if old is not None and old.size == stat.st_size and old.mtime_ns == stat.st_mtime_ns:
+            return old
+
+        entry = IndexEntry(stat.st_size, stat.st_mtime_ns)
+
+        if path.name.endswith('.dvpl'):
+            try:
+                entry.footer = read_footer(path)
+            except (OSError, ValueError, UnicodeDecodeError) as e:
+                entry.error = str(e)
+
+        return entry
+
+    def _update_meta(self) -> None:
+        meta = self.folder_meta
+        meta.folders_count = max(0, len(self.dirs) - 1)
+        meta.dvpl_count = sum(1 for record in self.dirs.values() for name in record.files if name.endswith('.dvpl'))
+        meta.files_count = sum(len(record.files) for record in self.dirs.values()) - meta.dvpl_count
+
+    def entries(self) -> Iterator[tuple[Path, IndexEntry]]:
+        for key, record in self.dirs.items():
+            folder = self.path.joinpath(key) if key else self.path
+            for name, entry in record.files.items():
+                yield folder.joinpath(name), entry
+
+    def get(self, path: Path) -> Optional[IndexEntry]:
+        key = path.parent.relative_to(self.path).as_posix()
+        record = self.dirs.get('' if key == '.' else key)
+        return record.files.get(path.name) if record is not None else None
+
+    def footer(self, path: Path, stat: os.stat_result) -> Optional[DVPLFooter]:
+        '''
+        ### Indexed footer of `path`, None if not indexed or the file changed since
+        '''
+        entry = self.get(path)
+
+        if entry is None or entry.size != stat.st_size or entry.mtime_ns != stat.st_mtime_ns:
+            return None
+
+        return entry.footer
+
+    def dvpl_files(self) -> list[Path]:
+        return [path for path, _ in self.entries() if path.name.endswith('.dvpl')]
+
+    def files(self) -> list[Path]:
+        return [path for path, _ in self.entries() if not path.name.endswith('.dvpl')]
+
+    def summary(self) -> IndexSummary:
+        summary = IndexSummary()
+
+        for path, entry in self.entries():
+            if not path.name.endswith('.dvpl'):
+                summary.files_size += entry.size
+                continue
+
+            summary.dvpl_count += 1
+            summary.packed_size += entry.size
+
+            if entry.footer is None:
+                summary.bad_count += 1
+                continue
+
+            name = entry.footer.compression_type.name
+            summary.unpacked_size += entry.footer.input_file_size
+            summary.compression_stats[name] = summary.compression_stats.get(name, 0) + 1
+
+        return summary
@@ -1,6 +1,13 @@
+import os
 from struct import unpack
 from io import BufferedIOBase, BufferedReader, BytesIO
-from typing import Literal
+from typing import Any, BinaryIO, Literal, Optional
+from zlib import crc32
+
+COPY_CHUNK_SIZE = 1024 * 1024
+'''
+### Chunk size for streaming reads and fallback copying
+'''
 
 
 class IO:
@@ -85,3 +92,72 @@ class IO:
         ### Skip `bytes_length` bytes from the buffer.
         '''
         buffer.read(bytes_length)
+
+
+def stream_crc32(file: BinaryIO, hasher: Optional[Any] = None, chunk_size: int = COPY_CHUNK_SIZE) -> tuple[int, int]:
+    '''
+    ### CRC32 and size of the rest of `file`, read in chunks (constant memory).
+
+    Chunks are also fed to `hasher` (`hashlib` object) if given.
+    '''
+    checksum = 0
+    size = 0
+    buffer = bytearray(chunk_size)
+
+    with memoryview(buffer) as view:
+        while read := file.readinto(buffer):
+            chunk = view[:read]
+            checksum = crc32(chunk, checksum)
+            if hasher is not None:
+                hasher.update(chunk)
+            size += read
+            chunk.release()
+
+    return checksum, size
+
+
+def copy_range(source_fd: int, target_fd: int, count: int, offset: int = 0) -> int:
+    '''
+    ### Copy `count` bytes from `offset` of `source_fd` to the current position of `target_fd`.
+
+    Bytes are moved kernel-side with `os.copy_file_range` or `os.sendfile` where supported,
+    otherwise copied in chunks. Returns copied bytes count (less than `count` at end of file).
+    '''
+    copied = 0
+
+    for kernel_copy in (getattr(os, 'copy_file_range', None), getattr(os, 'sendfile', None)):
+        if kernel_copy is None:
+            continue
+
+        try:
+            while copied < count:
+                if kernel_copy is os.sendfile:
+                    sent = kernel_copy(target_fd, source_fd, offset + copied, count - copied)
+                else:
+                    sent = kernel_copy(source_fd, target_fd, count - copied, offset + copied)
+
+                if sent == 0:
+                    return copied
+
+                copied += sent
+        except OSError:
+            # not supported for this file system / platform, try the next way
+            continue
+
+        return copied
+
+    os.lseek(source_fd, offset + copied, os.SEEK_SET)
+
+    while copied < count:
+        chunk = os.read(source_fd, min(COPY_CHUNK_SIZE, count - copied))
+        if not chunk:
+            break
+
+        with memoryview(chunk) as view:
+            written = 0
+            while written < len(chunk):
+                written += os.write(target_fd, view[written:])
+
+        copied += len(chunk)
+
+    return copied
@@ -0,0 +1,180 @@
+import json
+import os
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Optional, TextIO
+
+from lib.dvp_struct import read_footer
+
+JOURNAL_NAME = '.dvpl_journal.jsonl'
+JOURNAL_VERSION = 1
+
+JOURNAL_BATCH = 256
+'''
+### Completed files written to the journal per fsync
+'''
+
+JOURNAL_INTERVAL = 2.0
+'''
+### Max seconds between journal fsyncs
+'''
+
+
+@dataclass
+class JournalEntry:
+    key: str
+    '''
+    ### Source path relative to the source root (POSIX form)
+    '''
+    source_size: int
+    source_mtime_ns: int
+    output_size: int
+    crc32: int
+    '''
+    ### CRC32 of compressed block (pack, as in the footer) or of written data (unpack)
+    '''
+
+
+class JobJournal:
+    '''
+    ### Append-only record of completed files of a folder job, stored as `JOURNAL_NAME` in the target root.
+
+    First line is a header (job mode, source and output settings), then one `JournalEntry` per line.
+    Journal of a job with other settings is ignored, so outputs made with old settings are not kept.
+    Entries are written in batches: outputs are flushed to disk first, then the journal
+    is fsynced, so a journaled file is complete even after a power loss.
+    The journal is removed when the job finishes.
+    '''
+    def __init__(self, target_path: Path, source_path: Path, mode: str, settings: Optional[dict] = None) -> None:
+        self.path = target_path.joinpath(JOURNAL_NAME)
+        self.source = str(source_path.absolute())
+        self.mode = mode
+        self.settings = settings or {}
+        '''
+        ### Job options which affect outputs (compression type etc.), JSON-serializable
+        '''
+        self.entries: dict[str, JournalEntry] = {}
+        self.file: Optional[TextIO] = None
+        self.pending: list[tuple[JournalEntry, Path]] = []
+        self.last_flush = time.monotonic()
+
+    def header(self) -> dict:
+        return {'version': JOURNAL_VERSION, 'mode': self.mode, 'source': self.source, 'settings': self.settings}
+
+    def load(self) -> bool:
+        '''
+        ### Read entries of interrupted job, returns False if journal of other job, source or settings was ignored
+        '''
+        self.entries = {}
+
+        try:
+            with open(self.path, 'r', encoding='utf-8') as file:
+                if json.loads(file.readline()) != self.header():
+                    return False
+
+                for line in file:
+                    try:
+                        entry = JournalEntry(**json.loads(line))
+                    except (ValueError, TypeError):
+                        # last line may be cut by a crash
+                        continue
+
+                    self.entries[entry.key] = entry
+        except FileNotFoundError:
+            self.entries = {}
+        except (OSError, ValueError):
+            self.entries = {}
+            return False
+
+        return True
+
+    def open(self, resume: bool) -> None:
+        '''
+        ### Start writing, with `resume` loaded entries are kept, otherwise the journal starts over
+        '''
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        if not resume:
+            self.entries = {}
+
+        # compact kept entries into a new file, the old journal stays valid until the replace
+        temp_path = self.path.with_name(self.path.name + '.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            file.write(json.dumps(self.header()) + '\n')
+            for entry in self.entries.values():
+                file.write(json.dumps(asdict(entry)) + '\n')
+            file.flush()
+            os.fsync(file.fileno())
+
+        os.replace(temp_path, self.path)
+        self.file = open(self.path, 'a', encoding='utf-8')
+
+    def check(self, key: str, stat: os.stat_result, target: Path) -> bool:
+        '''
+        ### File `key` was completed and neither source nor output changed since
+        '''
+        entry = self.entries.get(key)
+
+        if entry is None or entry.source_size != stat.st_size or entry.source_mtime_ns != stat.st_mtime_ns:
+            return False
+
+        try:
+            if target.stat().st_size != entry.output_size:
+                return False
+
+            if self.mode == 'pack':
+                footer = read_footer(target)
+                return footer.compressed_block_crc32 == entry.crc32 and footer.compressed_block_size + 20 == entry.output_size
+        except (OSError, ValueError):
+            return False
+
+        return True
+
+    def add(self, key: str, stat: os.stat_result, target: Path, output_size: int, crc32: int) -> None:
+        entry = JournalEntry(key, stat.st_size, stat.st_mtime_ns, output_size, crc32)
+        self.entries[key] = entry
+        self.pending.append((entry, target))
+
+        if len(self.pending) >= JOURNAL_BATCH or time.monotonic() - self.last_flush >= JOURNAL_INTERVAL:
+            self.flush()
+
+    def flush(self) -> None:
+        '''
+        ### Make pending outputs durable, then append their entries and fsync the journal
+        '''
+        self.last_flush = time.monotonic()
+
+        if self.file is None or not self.pending:
+            return
+
+        for _, target in self.pending:
+            try:
+                with open(target, 'rb+') as file:
+                    os.fsync(file.fileno())
+            except OSError:
+                pass
+
+        for entry, _ in self.pending:
+            self.file.write(json.dumps(asdict(entry)) + '\n')
+
+        self.pending = []
+        self._sync_journal()
+
+    def _sync_journal(self) -> None:
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self, finished: bool) -> None:
+        '''
+        ### Flush and close, journal of finished job is removed
+        '''
+        if self.file is None:
+            return
+
+        self.flush()
+        self.file.close()
+        self.file = None
+
+        if finished:
+            self.path.unlink(missing_ok=True)
@@ -0,0 +1,152 @@
+import json
+import os
+from dataclasses import asdict, dataclass
+from hashlib import blake2b
+from pathlib import Path
+from typing import Optional
+
+from lib.dvp_struct import DVPLFooter
+
+MANIFEST_NAME = '.dvpl_manifest.json'
+MANIFEST_VERSION = 1
+
+
+def content_hasher() -> 'blake2b':
+    '''
+    ### Hash object for streaming `content_hash`
+    '''
+    return blake2b(digest_size=16)
+
+
+def content_hash(data: bytes | memoryview) -> str:
+    '''
+    ### Hex digest used to identify file content
+    '''
+    hasher = content_hasher()
+    hasher.update(data)
+    return hasher.hexdigest()
+
+
+@dataclass
+class ManifestEntry:
+    size: int
+    '''
+    ### Source file size (in bytes)
+    '''
+    mtime_ns: int
+    '''
+    ### Source file modification time
+    '''
+    content_hash: str
+    '''
+    ### Source content hash, see `content_hash`
+    '''
+    compression_type: str
+    '''
+    ### Compression type name of produced DVPL file
+    '''
+    compressed_block_size: int
+    compressed_block_crc32: int
+    requested_compression: Optional[str] = None
+    '''
+    ### Compression type name or `AUTO` requested for the pack, None in old manifests (same as `compression_type`)
+    '''
+
+    def output_size(self) -> int:
+        return self.compressed_block_size + 20
+
+
+class PackManifest:
+    '''
+    ### Record of sources packed into a target tree, stored as `MANIFEST_NAME` in the target root.
+
+    Keys are source paths relative to the source root (POSIX form).
+    '''
+    def __init__(self, target_path: Path, source_path: Path) -> None:
+        self.path = target_path.joinpath(MANIFEST_NAME)
+        self.source = str(source_path.absolute())
+        self.entries: dict[str, ManifestEntry] = {}
+
+    @classmethod
+    def load(cls, target_path: Path, source_path: Path) -> 'PackManifest':
+        '''
+        ### Load manifest, unreadable or foreign (other source tree) manifest gives an empty one
+        '''
+        manifest = cls(target_path, source_path)
+
+        try:
+            data = json.loads(manifest.path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return manifest
+
+        if data.get('version') != MANIFEST_VERSION or data.get('source') != manifest.source:
+            return manifest
+
+        try:
+            manifest.entries = {k: ManifestEntry(**v) for k, v in data['entries'].items()}
+        except (KeyError, TypeError):
+            manifest.entries = {}
+
+        return manifest
+
+    def save(self) -> None:
+        '''
+        ### Write manifest atomically
+        '''
+        data = {
+            'version': MANIFEST_VERSION,
+            'source': self.source,
+            'entries': {k: asdict(v) for k, v in sorted(self.entries.items())},
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_name(self.path.name + '.tmp')
+        temp_path.write_text(json.dumps(data), encoding='utf-8')
+        os.replace(temp_path, self.path)
+
+    def get(self, key: str) -> Optional[ManifestEntry]:
+        return self.entries.get(key)
+
+    def update(self, key: str, stat: os.stat_result, digest: str, footer: DVPLFooter, requested_compression: str) -> None:
+        self.entries[key] = ManifestEntry(
+            size=stat.st_size,
+            mtime_ns=stat.st_mtime_ns,
+            content_hash=digest,
+            compression_type=footer.compression_type.name,
+            compressed_block_size=footer.compressed_block_size,
+            compressed_block_crc32=footer.compressed_block_crc32,
+            requested_compression=requested_compression,
+        )
+
+    def touch(self, key: str, stat: os.stat_result) -> None:
+        '''
+        ### Content did not change, remember new modification time only
+        '''
+        self.entries[key].mtime_ns = stat.st_mtime_ns
+
+    def check(self, key: str, stat: os.stat_result, requested_compression: str, target: Path) -> Optional[bool]:
+        '''
+        ### Compare source with the manifest record, `requested_compression` is a type name or `AUTO`.
+
+        A file packed with another requested compression is packed again, even if AUTO chose the same type.
+
+        Returns True if the output is up to date, None if only the content hash can tell
+        (same size, other modification time) and False if the file must be packed.
+        '''
+        entry = self.entries.get(key)
+
+        if entry is None or entry.size != stat.st_size:
+            return False
+
+        if (entry.requested_compression or entry.compression_type) != requested_compression:
+            return False
+
+        try:
+            if target.stat().st_size != entry.output_size():
+                return False
+        except OSError:
+            return False
+
+        if entry.mtime_ns == stat.st_mtime_ns:
+            return True
+
+        return None
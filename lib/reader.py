@@ -0,0 +1,232 @@
+import io
+import os
+from collections import OrderedDict
+from os import SEEK_CUR, SEEK_END, SEEK_SET
+from pathlib import Path
+from threading import Lock
+from typing import BinaryIO, Optional
+
+from lib.codec import decompress_block
+from lib.dvp_struct import CompressionTypes, parse_footer
+
+DECODE_CACHE_SIZE = 256 * 1024 * 1024
+'''
+### Default max total size of decompressed files kept by `DECODE_CACHE`
+'''
+
+CacheKey = tuple[str, int, int, int]
+'''
+### Absolute path, size and mtime of the file and offset of DVPL data in it, a changed file gets a new key
+'''
+
+
+class DecodeCache:
+    '''
+    ### LRU cache of decompressed DVPL files, bounded by total size of kept data.
+
+    Files larger than `max_size` are never kept. Thread-safe.
+    '''
+    def __init__(self, max_size: int = DECODE_CACHE_SIZE) -> None:
+        self.max_size = max_size
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.entries: OrderedDict[CacheKey, bytes] = OrderedDict()
+        self.lock = Lock()
+
+    def get(self, key: CacheKey) -> Optional[bytes]:
+        with self.lock:
+            data = self.entries.get(key)
+
+            if data is None:
+                self.misses += 1
+                return None
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key: CacheKey, data: bytes) -> None:
+        with self.lock:
+            if len(data) > self.max_size:
+                return
+
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+
+            self.entries[key] = data
+            self.size += len(data)
+            self._evict()
+
+    def resize(self, max_size: int) -> None:
+        with self.lock:
+            self.max_size = max_size
+            self._evict()
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def _evict(self) -> None:
+        while self.size > self.max_size:
+            _, data = self.entries.popitem(last=False)
+            self.size -= len(data)
+
+
+DECODE_CACHE = DecodeCache()
+'''
+### Process-wide cache used by `open_dvpl` by default
+'''
+
+
+class DVPLReader(io.BufferedIOBase):
+    '''
+    ### Read-only seekable file object with unpacked content of DVPL file.
+
+    Only the footer is read on open. The payload is decompressed on first read and kept
+    in `cache`, so other readers of the same unchanged file do not decompress it again.
+    Stored (`NONE`) payload is read from the file directly and is not cached.
+    DVPL data may be a part of a bigger file (bundle, stored zip entry), set by `offset` and `length`.
+    '''
+    def __init__(self, path: Path, cache: Optional[DecodeCache] = None, offset: int = 0, length: Optional[int] = None) -> None:
+        super().__init__()
+        self.path = Path(path)
+        self.name = str(path)
+        self.cache = cache if cache is not None else DECODE_CACHE
+        self.offset = offset
+
+        stat = os.stat(self.path)
+        self.length = stat.st_size - offset if length is None else length
+        self.key: CacheKey = (str(self.path.absolute()), stat.st_size, stat.st_mtime_ns, offset)
+
+        if self.length < 20 or offset + self.length > stat.st_size:
+            raise ValueError(f'Invalid last bytes length: {self.path}')
+
+        with open(self.path, 'rb') as file:
+            file.seek(offset + self.length - 20)
+            self.footer = parse_footer(file.read(20))
+
+        self.size = self.footer.input_file_size
+        self.stored = self.footer.compression_type is CompressionTypes.NONE
+        self.position = 0
+        self._data: Optional[bytes] = None
+        self._file: Optional[BinaryIO] = None
+
+        if self.stored and self.length - 20 != self.size:
+            raise ValueError(f'Stored block size does not match input file size: {self.path}')
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        self._checkClosed()
+        return self.position
+
+    def seek(self, offset: int, whence: int = SEEK_SET) -> int:
+        self._checkClosed()
+
+        if whence == SEEK_SET:
+            position = offset
+        elif whence == SEEK_CUR:
+            position = self.position + offset
+        elif whence == SEEK_END:
+            position = self.size + offset
+        else:
+            raise ValueError(f'Invalid whence: {whence}')
+
+        if position < 0:
+            raise ValueError(f'Negative seek position: {position}')
+
+        self.position = position
+        return self.position
+
+    def read(self, size: Optional[int] = -1) -> bytes:
+        self._checkClosed()
+        count = self._count(size)
+
+        if count == 0:
+            return b''
+
+        if self.stored:
+            file = self._stored_file()
+            file.seek(self.offset + self.position)
+            data = file.read(count)
+        else:
+            data = self._decoded()[self.position:self.position + count]
+
+        self.position += len(data)
+        return data
+
+    def readinto(self, buffer: bytearray | memoryview) -> int:
+        self._checkClosed()
+
+        with memoryview(buffer) as view, view.cast('B') as target:
+            count = self._count(len(target))
+
+            if count == 0:
+                return 0
+
+            if self.stored:
+                file = self._stored_file()
+                file.seek(self.offset + self.position)
+                count = file.readinto(target[:count])
+            else:
+                with memoryview(self._decoded()) as source:
+                    target[:count] = source[self.position:self.position + count]
+
+        self.position += count
+        return count
+
+    read1 = read
+    readinto1 = readinto
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+        self._data = None
+        super().close()
+
+    def _count(self, size: Optional[int]) -> int:
+        remaining = max(0, self.size - self.position)
+
+        if size is None or size < 0:
+            return remaining
+
+        return min(size, remaining)
+
+    def _stored_file(self) -> BinaryIO:
+        if self._file is None:
+            self._file = open(self.path, 'rb')
+
+        return self._file
+
+    def _decoded(self) -> bytes:
+        if self._data is not None:
+            return self._data
+
+        data = self.cache.get(self.key)
+
+        if data is None:
+            with open(self.path, 'rb') as file:
+                file.seek(self.offset)
+                payload = file.read(self.length - 20)
+
+            data = bytes(decompress_block(payload, self.footer))
+            self.cache.put(self.key, data)
+
+        self._data = data
+        return data
+
+
+def open_dvpl(path: Path, cache: Optional[DecodeCache] = None) -> DVPLReader:
+    '''
+    ### Open DVPL file for reading its unpacked content, see `DVPLReader`
+    '''
+    return DVPLReader(path, cache)
@@ -0,0 +1,103 @@
+import json
+import os
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from lib.dvp_struct import DVPLFooter
+
+SYNC_NAME = '.dvpl_sync.json'
+SYNC_VERSION = 1
+
+
+@dataclass
+class SyncEntry:
+    input_file_size: int
+    compressed_block_size: int
+    compressed_block_crc32: int
+    compression_type: str
+    '''
+    ### Footer of DVPL file the output was unpacked from
+    '''
+    output_mtime_ns: int
+    '''
+    ### Output file modification time, an edited output is unpacked again
+    '''
+
+    def matches(self, footer: DVPLFooter) -> bool:
+        return self.input_file_size == footer.input_file_size \
+            and self.compressed_block_size == footer.compressed_block_size \
+            and self.compressed_block_crc32 == footer.compressed_block_crc32 \
+            and self.compression_type == footer.compression_type.name
+
+
+class SyncRecord:
+    '''
+    ### Record of DVPL files unpacked into a target tree, stored as `SYNC_NAME` in the target root.
+
+    Keys are DVPL paths relative to the source root (POSIX form). Unlike `PackManifest` the record
+    is not bound to the source path: a new version of the packed tree is compared with the record
+    by footers, so only changed and added files are unpacked.
+    '''
+    def __init__(self, target_path: Path) -> None:
+        self.path = target_path.joinpath(SYNC_NAME)
+        self.entries: dict[str, SyncEntry] = {}
+
+    @classmethod
+    def load(cls, target_path: Path) -> 'SyncRecord':
+        '''
+        ### Load record, unreadable record gives an empty one (everything is unpacked)
+        '''
+        record = cls(target_path)
+
+        try:
+            data = json.loads(record.path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return record
+
+        if data.get('version') != SYNC_VERSION:
+            return record
+
+        try:
+            record.entries = {k: SyncEntry(**v) for k, v in data['entries'].items()}
+        except (KeyError, TypeError):
+            record.entries = {}
+
+        return record
+
+    def save(self) -> None:
+        '''
+        ### Write record atomically
+        '''
+        data = {
+            'version': SYNC_VERSION,
+            'entries': {k: asdict(v) for k, v in sorted(self.entries.items())},
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_name(self.path.name + '.tmp')
+        temp_path.write_text(json.dumps(data), encoding='utf-8')
+        os.replace(temp_path, self.path)
+
+    def check(self, key: str, footer: DVPLFooter, target: Path) -> bool:
+        '''
+        ### Output of `key` was unpacked from a DVPL file with the same footer and was not changed since
+        '''
+        entry = self.entries.get(key)
+
+        if entry is None or not entry.matches(footer):
+            return False
+
+        try:
+            stat = target.stat()
+        except OSError:
+            return False
+
+        return stat.st_size == entry.input_file_size and stat.st_mtime_ns == entry.output_mtime_ns
+
+    def update(self, key: str, footer: DVPLFooter, target: Path) -> None:
+        self.entries[key] = SyncEntry(
+            input_file_size=footer.input_file_size,
+            compressed_block_size=footer.compressed_block_size,
+            compressed_block_crc32=footer.compressed_block_crc32,
+            compression_type=footer.compression_type.name,
+            output_mtime_ns=target.stat().st_mtime_ns,
+        )
@@ -0,0 +1,158 @@
+import json
+import math
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Optional, TextIO
+
+
+class StageTimer:
+    '''
+    ### Time and bytes spent in named stages of one file job.
+
+    Every `mark` closes the current stage, so the file job is split into
+    consecutive stages without nested timers.
+    '''
+    __slots__ = ('stages', 'stage_bytes', '_last')
+
+    def __init__(self) -> None:
+        self.stages: dict[str, float] = {}
+        self.stage_bytes: dict[str, int] = {}
+        self._last = time.perf_counter()
+
+    def mark(self, stage: str, size: int = 0) -> None:
+        now = time.perf_counter()
+        self.stages[stage] = self.stages.get(stage, 0.0) + now - self._last
+        self._last = now
+
+        if size:
+            self.stage_bytes[stage] = self.stage_bytes.get(stage, 0) + size
+
+    def skip(self) -> None:
+        '''
+        ### Start the next stage now, time since the last mark is not counted
+        '''
+        self._last = time.perf_counter()
+
+    def total(self) -> float:
+        return sum(self.stages.values())
+
+
+@dataclass
+class StageSummary:
+    count: int
+    total: float
+    p50: float
+    p90: float
+    p99: float
+    max: float
+    bytes: int = 0
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            'count': self.count,
+            'total': round(self.total, 6),
+            'p50': round(self.p50, 6),
+            'p90': round(self.p90, 6),
+            'p99': round(self.p99, 6),
+            'max': round(self.max, 6),
+            'bytes': self.bytes,
+        }
+
+    def __str__(self):
+        data = f'{self.total:.3f} s'
+
+        if self.count > 1:
+            data += f' (p50 {self.p50 * 1000:.2f} ms, p90 {self.p90 * 1000:.2f} ms, p99 {self.p99 * 1000:.2f} ms)'
+
+        if self.bytes and self.total > 0:
+            data += f', {self.bytes / self.total / 1024 / 1024:.1f} MB/s'
+
+        return data
+
+
+def _percentile(values: list[float], percent: float) -> float:
+    '''
+    ### Nearest-rank percentile of sorted `values`
+    '''
+    if not values:
+        return 0.0
+
+    return values[max(0, math.ceil(percent / 100 * len(values)) - 1)]
+
+
+class StageStats:
+    '''
+    ### Per-stage samples of a whole job, summarized with totals and percentiles
+    '''
+    def __init__(self) -> None:
+        self.samples: dict[str, list[float]] = {}
+        self.stage_bytes: dict[str, int] = {}
+
+    def add(self, timer: StageTimer) -> None:
+        for stage, seconds in timer.stages.items():
+            self.samples.setdefault(stage, []).append(seconds)
+
+        for stage, size in timer.stage_bytes.items():
+            self.stage_bytes[stage] = self.stage_bytes.get(stage, 0) + size
+
+        self.samples.setdefault('file_total', []).append(timer.total())
+
+    def add_stage(self, stage: str, seconds: float) -> None:
+        '''
+        ### Add sample of a job-level stage (scan, clean up, ...)
+        '''
+        self.samples.setdefault(stage, []).append(seconds)
+
+    def summary(self) -> dict[str, StageSummary]:
+        result = {}
+
+        for stage, values in self.samples.items():
+            values = sorted(values)
+            result[stage] = StageSummary(
+                count=len(values),
+                total=sum(values),
+                p50=_percentile(values, 50),
+                p90=_percentile(values, 90),
+                p99=_percentile(values, 99),
+                max=values[-1],
+                bytes=self.stage_bytes.get(stage, 0),
+            )
+
+        return result
+
+
+class TraceWriter:
+    '''
+    ### JSONL trace, one record per processed file and a final `{"summary": ...}` record.
+    Written on the job thread only.
+    '''
+    def __init__(self, path: Optional[Path]) -> None:
+        self.path = path
+        self.file: Optional[TextIO] = None
+
+    def __enter__(self) -> 'TraceWriter':
+        if self.path is not None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.file = open(self.path, 'w', encoding='utf-8')
+
+        return self
+
+    def __exit__(self, *args) -> None:
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def write(self, record: dict[str, Any]) -> None:
+        if self.file is not None:
+            self.file.write(json.dumps(record) + '\n')
+
+    def write_summary(self, summary: dict[str, Any]) -> None:
+        '''
+        ### Append end-of-job record, also after the writer was closed
+        '''
+        if self.path is None:
+            return
+
+        with open(self.path, 'a', encoding='utf-8') as file:
+            file.write(json.dumps({'summary': summary}) + '\n')
@@ -0,0 +1,124 @@
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Optional
+from zlib import crc32
+
+from lib.codec import decompress_block
+from lib.dvp_struct import DVPLFooter, DVPLFooterStruct, CompressionTypes
+
+
+@dataclass
+class VerifyResult:
+    path: str
+    errors: list[str] = field(default_factory=list)
+    footer: Optional[DVPLFooter] = None
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    def to_dict(self) -> dict[str, Any]:
+        footer = None
+
+        if self.footer is not None:
+            footer = {
+                'input_file_size': self.footer.input_file_size,
+                'compressed_block_size': self.footer.compressed_block_size,
+                'compressed_block_crc32': self.footer.compressed_block_crc32,
+                'compression_type': self.footer.compression_type.name,
+                'footer_label': self.footer.footer_label,
+            }
+
+        return {'path': self.path, 'errors': self.errors, 'footer': footer}
+
+
+@dataclass
+class VerifyReport:
+    path: str
+    checked: int = 0
+    bad_files: list[VerifyResult] = field(default_factory=list)
+    elapsed: float = 0.0
+    canceled: bool = False
+
+    def add(self, result: VerifyResult) -> None:
+        self.checked += 1
+
+        if not result.ok:
+            self.bad_files.append(result)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            'path': self.path,
+            'checked': self.checked,
+            'bad': len(self.bad_files),
+            'elapsed': round(self.elapsed, 3),
+            'canceled': self.canceled,
+            'bad_files': [x.to_dict() for x in self.bad_files],
+        }
+
+    def __str__(self):
+        data = \
+            f'Verify result:\n' \
+            f"-|  Path: {self.path}\n"\
+            f"-|  Checked: {self.checked}\n"\
+            f"-|  Bad: {len(self.bad_files)}\n"\
+            f"-|  Elapsed: {self.elapsed:.2f} s\n"\
+            f"-|  Canceled: {self.canceled}\n"
+
+        return data
+
+
+def verify_file(path: Path, decompress: bool = False) -> VerifyResult:
+    '''
+    ### Check footer label, sizes and CRC32 of DVPL file `path`.
+
+    With `decompress` the block is also decompressed in memory (nothing is written).
+    Unreadable file is reported as an error too.
+    '''
+    result = VerifyResult(path=str(path))
+
+    try:
+        data = DVPLFooterStruct.from_path(path)
+    except OSError as e:
+        result.errors.append(f'unreadable file: {e}')
+        return result
+    except (ValueError, UnicodeDecodeError) as e:
+        result.errors.append(f'invalid footer: {e}')
+        return result
+
+    footer = data.footer_data
+    result.footer = footer
+
+    if footer.footer_label != 'DVPL':
+        result.errors.append(f'invalid footer label: {footer.footer_label!r}')
+
+    if data.file_size - 20 != footer.compressed_block_size:
+        result.errors.append(
+            f'compressed block size mismatch: footer {footer.compressed_block_size}, file {data.file_size - 20}'
+        )
+        return result
+
+    if footer.compression_type is CompressionTypes.NONE and footer.compressed_block_size != footer.input_file_size:
+        result.errors.append(
+            f'stored block size mismatch: footer {footer.input_file_size}, block {footer.compressed_block_size}'
+        )
+
+    try:
+        with data.map_payload() as payload:
+            block_crc32 = crc32(payload)
+
+            if block_crc32 != footer.compressed_block_crc32:
+                result.errors.append(f'crc32 mismatch: footer {footer.compressed_block_crc32:08x}, block {block_crc32:08x}')
+
+            elif decompress and footer.compression_type is not CompressionTypes.NONE:
+                try:
+                    size = len(decompress_block(payload, footer))
+                except ValueError as e:
+                    result.errors.append(f'decompression failed: {e}')
+                else:
+                    if size != footer.input_file_size:
+                        result.errors.append(f'decompressed size mismatch: footer {footer.input_file_size}, got {size}')
+    except OSError as e:
+        result.errors.append(f'unreadable file: {e}')
+
+    return result
@@ -0,0 +1,45 @@
+from pathlib import Path
+
+import pytest
+
+import cli
+from lib.bundle import BundleReader, BundleWriter, entry_target
+from lib.codec import compress_block
+from lib.dvp_struct import CompressionTypes, DVPLFooterStruct
+
+EVIL_NAME = 'x/../../../escaped.txt.dvpl'
+
+
+def make_bundle(path: Path, root: Path, names: list[str]) -> None:
+    data = b'escaped content'
+    block = compress_block(data, CompressionTypes.LZ4)
+    footer = DVPLFooterStruct.generate_footer(len(data), len(block), 0, CompressionTypes.LZ4.value)
+
+    with BundleWriter(path, root) as bundle:
+        for name in names:
+            bundle.add(root.joinpath(name), block, footer)
+
+
+def test_entry_target_rejects_escaping_names(tmp_path: Path):
+    assert entry_target(tmp_path, 'a/b.dvpl') == tmp_path.resolve().joinpath('a', 'b.dvpl')
+
+    for name in (EVIL_NAME, '../a.dvpl', '/etc/a.dvpl', '', '.'):
+        with pytest.raises(ValueError):
+            entry_target(tmp_path, name)
+
+
+def test_malicious_entry_is_not_written_outside_output(tmp_path: Path):
+    bundle_path = tmp_path.joinpath('evil.dvplb')
+    output = tmp_path.joinpath('a', 'b', 'out')
+    make_bundle(bundle_path, tmp_path.joinpath('root'), ['ok.txt.dvpl', EVIL_NAME])
+
+    with pytest.raises(ValueError):
+        BundleReader(bundle_path).extract(output)
+
+    assert cli.main([
+        'bundle', str(bundle_path), 'ok.txt.dvpl', EVIL_NAME, '-o', str(output), '--unpack'
+    ]) == 1
+
+    assert not output.exists()
+    assert not output.parent.parent.joinpath('escaped.txt').exists()
+    assert not output.parent.parent.joinpath('escaped.txt.dvpl').exists()
@@ -0,0 +1,54 @@
+import os
+from pathlib import Path
+
+import pytest
+
+import cli
+
+COMPRESSIONS = ['NONE', 'LZ4', 'LZ4_HC', 'RFC1951', 'AUTO']
+MODES = {
+    'serial': ['-j', '1', '--no-pipeline'],
+    'threads': ['-j', '4'],
+    'process': ['-j', '4', '--executor', 'process'],
+}
+
+
+def make_tree(root: Path) -> None:
+    text = b''.join(b'line %d of some config text\n' % i for i in range(5000))
+    files = {
+        'configs/a.yaml': text,
+        'configs/nested/b.yaml': text[::-1],
+        'textures/random.bin': os.urandom(300_000),
+        'sfx/sound.ogg': os.urandom(50_000),
+        'empty.txt': b'',
+        'small.txt': b'x',
+    }
+
+    for name, data in files.items():
+        path = root.joinpath(name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+
+
+def tree_bytes(root: Path) -> dict[str, bytes]:
+    return {x.relative_to(root).as_posix(): x.read_bytes() for x in sorted(root.rglob('*')) if x.is_file()}
+
+
+@pytest.mark.parametrize('compression', COMPRESSIONS)
+def test_pack_is_identical_in_all_modes_and_round_trips(tmp_path: Path, compression: str):
+    source = tmp_path.joinpath('source')
+    make_tree(source)
+    outputs = {}
+
+    for mode, args in MODES.items():
+        target = tmp_path.joinpath(mode)
+        assert cli.main(['pack', str(source), '-o', str(target), '-c', compression, '-q'] + args) == 0
+        outputs[mode] = tree_bytes(target)
+
+    assert outputs['threads'] == outputs['serial']
+    assert outputs['process'] == outputs['serial']
+    assert len(outputs['serial']) == len(tree_bytes(source))
+
+    unpacked = tmp_path.joinpath('unpacked')
+    assert cli.main(['unpack', str(tmp_path.joinpath('threads')), '-o', str(unpacked), '-j', '4', '-q']) == 0
+    assert tree_bytes(unpacked) == tree_bytes(source)
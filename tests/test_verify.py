@@ -0,0 +1,38 @@
+from pathlib import Path
+from zlib import crc32
+
+from lib.codec import compress_block
+from lib.dvp_struct import CompressionTypes, DVPLFooterStruct, Folder
+from lib.engine import DVPLEngine
+from lib.verify import verify_file
+
+
+def write_dvpl(path: Path, data: bytes) -> None:
+    block = compress_block(data, CompressionTypes.LZ4)
+    footer = DVPLFooterStruct.generate_footer(len(data), len(block), crc32(block), CompressionTypes.LZ4.value)
+    path.write_bytes(bytes(block) + footer)
+
+
+def test_unreadable_file_is_reported(tmp_path: Path):
+    missing = tmp_path.joinpath('missing.txt.dvpl')
+    missing.symlink_to(tmp_path.joinpath('nowhere'))
+
+    result = verify_file(missing)
+    assert not result.ok
+    assert result.errors[0].startswith('unreadable file')
+
+    folder = tmp_path.joinpath('folder.dvpl')
+    folder.mkdir()
+    assert verify_file(folder, decompress=True).errors[0].startswith('unreadable file')
+
+
+def test_verify_folder_reports_unreadable_file(tmp_path: Path):
+    write_dvpl(tmp_path.joinpath('good.txt.dvpl'), b'good content' * 100)
+    write_dvpl(tmp_path.joinpath('bad.txt.dvpl'), b'removed after scan')
+    folder = Folder(tmp_path)
+    tmp_path.joinpath('bad.txt.dvpl').unlink()
+
+    report = DVPLEngine().verify_folder(folder, decompress=True)
+
+    assert report.checked == 2
+    assert [Path(x.path).name for x in report.bad_files] == ['bad.txt.dvpl']
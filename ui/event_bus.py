@@ -0,0 +1,54 @@
+import traceback
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from itertools import count
+from threading import Lock
+from typing import Any, Optional
+
+import customtkinter as ctk
+
+EVENTS_INTERVAL_MS = 16
+'''
+### Event queue drain interval, about one drain per frame
+'''
+
+
+class EventBus:
+    '''
+    ### Thread-safe queue of UI updates, drained on the Tk main loop.
+
+    Worker threads must not touch widgets, they post `func(*args)` calls here instead.
+    Events posted with the same `key` are coalesced: only the latest one runs,
+    at the position of the latest post. Events without key always run, in posting order.
+    '''
+    def __init__(self, widget: ctk.CTkBaseClass, interval_ms: int = EVENTS_INTERVAL_MS) -> None:
+        self.widget = widget
+        self.interval_ms = interval_ms
+        self.lock = Lock()
+        self.pending: OrderedDict[Hashable, tuple[Callable[..., Any], tuple]] = OrderedDict()
+        self._counter = count()
+
+        self.widget.after(self.interval_ms, self._drain)
+
+    def post(self, func: Callable[..., Any], *args: Any, key: Optional[str] = None) -> None:
+        with self.lock:
+            if key is None:
+                self.pending[next(self._counter)] = (func, args)
+                return
+
+            self.pending.pop(key, None)
+            self.pending[key] = (func, args)
+
+    def _drain(self) -> None:
+        with self.lock:
+            events = self.pending
+            self.pending = OrderedDict()
+
+        try:
+            for func, args in events.values():
+                try:
+                    func(*args)
+                except Exception:
+                    traceback.print_exc()
+        finally:
+            self.widget.after(self.interval_ms, self._drain)
@@ -1,9 +1,83 @@
+import time
+from collections import deque
+from pathlib import Path
+from threading import Lock
+from typing import Optional, TextIO
+
 import customtkinter as ctk
 
+LOG_BUFFER_SIZE = 10000
+'''
+### Log records kept in memory, older records are dropped (or only kept in the spill file)
+'''
+
+LOG_DISPLAY_LINES = 1000
+'''
+### Max lines shown in the log widget
+'''
+
+LOG_REFRESH_MS = 100
+'''
+### Log widget refresh interval
+'''
+
+
+class LogBuffer:
+    '''
+    ### Fixed-size ring buffer of log records, safe to use from any thread.
+
+    With `spill_path` every record is also appended to the file, so nothing is lost.
+    '''
+    def __init__(self, max_records: int = LOG_BUFFER_SIZE, spill_path: Optional[Path] = None) -> None:
+        self.lock = Lock()
+        self.records: deque[str] = deque(maxlen=max_records)
+        self.total = 0
+        '''
+        ### Records count added since start, including dropped ones
+        '''
+        self.spill_file: Optional[TextIO] = None
+
+        if spill_path is not None:
+            self.set_spill_file(spill_path)
+
+    def set_spill_file(self, path: Optional[Path]) -> None:
+        with self.lock:
+            if self.spill_file is not None:
+                self.spill_file.close()
+                self.spill_file = None
+
+            if path is not None:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                self.spill_file = open(path, 'a', encoding='utf-8')
+
+    def append(self, record: str) -> None:
+        with self.lock:
+            self.records.append(record)
+            self.total += 1
+
+            if self.spill_file is not None:
+                self.spill_file.write(record + '\n')
+
+    def tail(self, since: int, limit: int) -> tuple[list[str], int]:
+        '''
+        ### Records added after record number `since` (at most `limit` last ones) and current total
+        '''
+        with self.lock:
+            count = min(self.total - since, len(self.records), limit)
+            records = [self.records[i] for i in range(len(self.records) - count, len(self.records))]
+            return records, self.total
+
+    def close(self) -> None:
+        self.set_spill_file(None)
+
 
 class CustomLogFrame(ctk.CTkFrame):
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, spill_path: Optional[Path] = None, **kwargs):
         super().__init__(*args, **kwargs)
+
+        self.log_buffer = LogBuffer(spill_path=spill_path)
+        self.shown_total = 0
+        self.progress_start = time.monotonic()
         
         self.task_font = ctk.CTkFont(family="Cascadia Code", size=12)
         self.log_font = ctk.CTkFont(family="Cascadia Code", size=12)
@@ -27,16 +101,27 @@ class CustomLogFrame(ctk.CTkFrame):
         self.task.pack(fill="both")
         self.progress_bar_label.pack()
         self.progress_bar.pack(fill="both", anchor='sw', pady=5)
+
+        self.after(LOG_REFRESH_MS, self._refresh_log)
         
     def set_task(self, task: str):
         self.task.delete('1.0', 'end')
         self.task.insert('1.0', task)
 
-    def set_pb_value(self, value: int, max: int):
+    def set_pb_value(self, value: int, max: int, done_bytes: int = 0, total_bytes: int = 0):
+        '''
+        ### Show progress of `value` / `max` files, with `total_bytes` the bar and ETA follow processed bytes
+        '''
         if max <= 0:
             max = 1
+
+        if value <= 0:
+            self.progress_start = time.monotonic()
         
         normalized_value = value / max
+        if total_bytes > 0 and value < max:
+            normalized_value = min(done_bytes / total_bytes, 0.9999)
+
         if normalized_value >= 1:
             normalized_value = 1
             
@@ -44,7 +129,16 @@ class CustomLogFrame(ctk.CTkFrame):
             self.progress_bar_label.configure(text_color="green", text="Done!")
         else:
             self.progress_bar.configure(progress_color="orange")
-            self.progress_bar_label.configure(text_color="orange", text=f"processing... ({normalized_value*100:.2f}%) - {value}/{max}")
+            text = f"processing... ({normalized_value*100:.2f}%) - {value}/{max}"
+
+            if total_bytes > 0:
+                text += f" | {done_bytes / 1024 / 1024:.1f}/{total_bytes / 1024 / 1024:.1f} MB"
+
+                if done_bytes > 0:
+                    eta = int((time.monotonic() - self.progress_start) * (total_bytes - done_bytes) / done_bytes)
+                    text += f" | ETA {eta // 60}:{eta % 60:02d}"
+
+            self.progress_bar_label.configure(text_color="orange", text=text)
         
         self.progress_bar.set(normalized_value)
     
@@ -69,5 +163,34 @@ class CustomLogFrame(ctk.CTkFrame):
         self.progress_bar_label.configure(text_color="red", text="DVPD file not found!")
 
     def add_log(self, log: str, prefix: str = "[app]: "):
-        self.log.insert('end', prefix + log + '\n')
-        self.log.see('end')
+        '''
+        ### Add record to the log buffer, widget is updated by `_refresh_log`. Safe to call from any thread.
+        '''
+        self.log_buffer.append(prefix + log)
+
+    def _refresh_log(self):
+        '''
+        ### Show new buffered records, keep at most `LOG_DISPLAY_LINES` lines in the widget.
+
+        While the log is scrolled up the view is not changed.
+        '''
+        try:
+            if self.log_buffer.total != self.shown_total and self.log.yview()[1] >= 1.0:
+                records, self.shown_total = self.log_buffer.tail(self.shown_total, LOG_DISPLAY_LINES)
+
+                if len(records) >= LOG_DISPLAY_LINES:
+                    self.log.delete('1.0', 'end')
+
+                self.log.insert('end', '\n'.join(records) + '\n')
+
+                lines = int(self.log.index('end-1c').split('.')[0]) - 1
+                if lines > LOG_DISPLAY_LINES:
+                    self.log.delete('1.0', f'{lines - LOG_DISPLAY_LINES + 1}.0')
+
+                self.log.see('end')
+        finally:
+            self.after(LOG_REFRESH_MS, self._refresh_log)
+
+    def destroy(self):
+        self.log_buffer.close()
+        super().destroy()
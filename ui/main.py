@@ -1,9 +1,11 @@
+import os
 from pathlib import Path
 from functools import partial
 
 import customtkinter as ctk
 
 from lib.data_classes import CommonFile
+from ui.event_bus import EventBus
 from ui.log_frame import CustomLogFrame
 from ui.metadata_frame import TaskMetadataFrame
 from ui.side_bar import SideBar
@@ -104,6 +106,7 @@ def extract_folder(frame: 'MasterFrame') -> None:
     extract_data_folder.keep_originals = frame.side_bar.keep_orig_state
     extract_data_folder.skip_if_exists = frame.side_bar.skip_if_exist_state
     extract_data_folder.fast_mode = frame.side_bar.fast_mode_state
+    extract_data_folder.journal = frame.side_bar.journal_state
     extract_data_folder.compression_type = frame.side_bar.compression_state
     
     frame.side_bar.target_unpack_label.configure(text=f"Unpack to...\n{extract_data_folder.extract_path}")
@@ -127,7 +130,9 @@ class MasterFrame(ctk.CTkFrame):
         
         self.rowconfigure(0, weight=10)
         
-        self.log_frame = CustomLogFrame(self)
+        self.events = EventBus(self)
+        log_file = os.environ.get('DVPL_EXTRACTOR_LOG')
+        self.log_frame = CustomLogFrame(self, spill_path=Path(log_file) if log_file else None)
         self.metadata_frame = TaskMetadataFrame(self)
         self.side_bar = SideBar(self)
         
@@ -179,7 +184,7 @@ class CTkApp(ctk.CTk):
 
         self.main_frame = MasterFrame(self)
         self.main_frame.pack(fill="both", expand=True)
-        self.main_frame.side_bar.run_monitoring()
+        self.main_frame.side_bar.run_monitoring(self.main_frame.events)
         self.main_frame.log_frame.add_log("Start monitoring", prefix="[app]: ")
         self.main_frame.log_frame.add_log("App started", prefix="[app]: ")
 
@@ -2,11 +2,16 @@ import time
 import psutil
 from collections.abc import Callable
 from threading import Thread
+from typing import TYPE_CHECKING
 
 import customtkinter as ctk
 
+from lib.codec import AUTO_COMPRESSION
 from lib.dvp_struct import CompressionTypes
 
+if TYPE_CHECKING:
+    from ui.event_bus import EventBus
+
 class SideBar(ctk.CTkFrame):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -20,7 +25,7 @@ class SideBar(ctk.CTkFrame):
         
         self.segmented_button = ctk.CTkSegmentedButton(
             self, 
-            values=[x.name for x in CompressionTypes if x != CompressionTypes.RFC1951], 
+            values=[x.name for x in CompressionTypes] + [AUTO_COMPRESSION], 
             state='disabled',
             variable=self.compression_state
         )
@@ -31,14 +36,17 @@ class SideBar(ctk.CTkFrame):
         self.keep_orig_state = ctk.BooleanVar(value=True)
         self.skip_if_exist_state = ctk.BooleanVar(value=False)
         self.fast_mode_state = ctk.BooleanVar(value=False)
+        self.journal_state = ctk.BooleanVar(value=False)
         
         self.keep_orig_check = ctk.CTkCheckBox(self.control_check_frame, text="Keep original files", onvalue=True, offvalue=False, variable=self.keep_orig_state)
         self.skip_if_exist_check = ctk.CTkCheckBox(self.control_check_frame, text="Skip if file exists", onvalue=1, offvalue=0, variable=self.skip_if_exist_state)
         self.fast_mode_check = ctk.CTkCheckBox(self.control_check_frame, text="Fast mode", onvalue=1, offvalue=0, variable=self.fast_mode_state)
+        self.journal_check = ctk.CTkCheckBox(self.control_check_frame, text="Journal", onvalue=1, offvalue=0, variable=self.journal_state)
         
         self.keep_orig_check.pack(side="left", expand=True, pady=5)
         self.skip_if_exist_check.pack(side="left", expand=True, pady=5)
         self.fast_mode_check.pack(side="left", expand=True, pady=5)
+        self.journal_check.pack(side="left", expand=True, pady=5)
 
         self.pack_btn = ctk.CTkButton(self.control_btn_frame, text="PACK", state='disabled')
         self.unpack_btn = ctk.CTkButton(self.control_btn_frame, text="UNPACK", state='disabled', fg_color='green', hover_color='#007300')
@@ -218,23 +226,17 @@ class SideBar(ctk.CTkFrame):
         self.unpack_btn.configure(state='normal')
         self.segmented_button.configure(state='normal')
 
-    def run_monitoring(self):
-        Thread(target=self._monitoring, daemon=True, name="MonitoringThread").start()
+    def run_monitoring(self, events: 'EventBus'):
+        Thread(target=self._monitoring, args=(events, ), daemon=True, name="MonitoringThread").start()
         
-    def _monitoring(self):
+    def _monitoring(self, events: 'EventBus'):
         process = psutil.Process()
         while True:
             proc_cpu_usage = process.cpu_percent()
             ram_usage, ram_free = psutil.virtual_memory().used, psutil.virtual_memory().free
             io_counters = process.io_counters()
             
-            self.ram_load_bar.set(ram_usage / (ram_usage + ram_free))
-            self.cpu_load_bar.set(proc_cpu_usage / 100)
-            
-            self.cpu_load_label.configure(text=f'CPU Load (process): {proc_cpu_usage}%')
-            self.ram_load_label.configure(
-                text=f'RAM Load: used {round(ram_usage / 1024 / 1024)} MB / free {round(ram_free / 1024 / 1024)} MB ({round(process.memory_info().rss / 1024 / 1024)} MB)'
-            )
+            events.post(self._set_load, proc_cpu_usage, ram_usage, ram_free, process.memory_info().rss, key='monitoring_load')
             
             time.sleep(1)
             io_counters_next = process.io_counters()
@@ -242,6 +244,18 @@ class SideBar(ctk.CTkFrame):
             current_write_speed = io_counters_next.write_bytes - io_counters.write_bytes
             current_read_speed = io_counters_next.read_bytes - io_counters.read_bytes
             
-            self.read_write_speed_label.configure(
-                text=f'IO Speed | Read: {round(current_read_speed / 1024 / 1024)} MB / Write: {round(current_write_speed / 1024 / 1024)} MB'
-            )
+            events.post(self._set_io_speed, current_read_speed, current_write_speed, key='monitoring_io')
+
+    def _set_load(self, proc_cpu_usage: float, ram_usage: int, ram_free: int, rss: int):
+        self.ram_load_bar.set(ram_usage / (ram_usage + ram_free))
+        self.cpu_load_bar.set(proc_cpu_usage / 100)
+        
+        self.cpu_load_label.configure(text=f'CPU Load (process): {proc_cpu_usage}%')
+        self.ram_load_label.configure(
+            text=f'RAM Load: used {round(ram_usage / 1024 / 1024)} MB / free {round(ram_free / 1024 / 1024)} MB ({round(rss / 1024 / 1024)} MB)'
+        )
+
+    def _set_io_speed(self, read_speed: int, write_speed: int):
+        self.read_write_speed_label.configure(
+            text=f'IO Speed | Read: {round(read_speed / 1024 / 1024)} MB / Write: {round(write_speed / 1024 / 1024)} MB'
+        )